@@ -0,0 +1,53 @@
+"""slim down indexes
+
+Drops indexes that duplicate a primary key or have no reader, and replaces
+the two total_score indexes on leaderboard with a single covering one.
+
+Revision ID: 11e40741e08d
+Revises: 885c25995959
+Create Date: 2026-10-18 15:48:10.772301
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '11e40741e08d'
+down_revision: Union[str, None] = '885c25995959'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Databases created through Base.metadata.create_all() have indexes that the
+# earlier migrations never created, so drops are guarded with IF EXISTS.
+REDUNDANT_INDEXES = [
+    ('users', 'ix_users_id', ['id']),
+    ('game_sessions', 'ix_game_sessions_id', ['id']),
+    ('game_sessions', 'ix_game_sessions_user_id', ['user_id']),
+    ('game_sessions', 'ix_game_sessions_score', ['score']),
+    ('game_sessions', 'ix_game_sessions_game_mode', ['game_mode']),
+    ('game_sessions', 'ix_game_sessions_timestamp', ['timestamp']),
+    ('game_sessions', 'idx_timestamp_score', [sa.text('timestamp DESC'), sa.text('score DESC')]),
+    ('leaderboard', 'ix_leaderboard_user_id', ['user_id']),
+    ('leaderboard', 'ix_leaderboard_total_score', ['total_score']),
+    ('leaderboard', 'ix_leaderboard_rank', ['rank']),
+    ('leaderboard', 'idx_leaderboard_score', [sa.text('total_score DESC')]),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for _, name, _ in REDUNDANT_INDEXES:
+        op.execute(f'DROP INDEX IF EXISTS {name}')
+
+    op.create_index('idx_user_score', 'game_sessions', ['user_id', sa.text('score DESC')], unique=False, if_not_exists=True)
+    op.create_index('idx_leaderboard_score_user', 'leaderboard', [sa.text('total_score DESC'), 'user_id'], unique=False, postgresql_include=['rank'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_leaderboard_score_user', table_name='leaderboard')
+    for table, name, columns in REDUNDANT_INDEXES:
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
@@ -0,0 +1,41 @@
+"""add leaderboard rebuild tables
+
+Revision ID: 392acba75709
+Revises: 46b10eba1688
+Create Date: 2026-10-18 13:02:57.640915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '392acba75709'
+down_revision: Union[str, None] = '46b10eba1688'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('leaderboard_staging',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('total_score', sa.Float(), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_table('rebuild_checkpoints',
+    sa.Column('job', sa.String(length=64), nullable=False),
+    sa.Column('last_user_id', sa.Integer(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('job')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('rebuild_checkpoints')
+    op.drop_table('leaderboard_staging')
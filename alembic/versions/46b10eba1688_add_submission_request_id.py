@@ -0,0 +1,36 @@
+"""add submission request_id
+
+Revision ID: 46b10eba1688
+Revises: c68b3f96c626
+Create Date: 2026-10-18 11:40:03.128870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '46b10eba1688'
+down_revision: Union[str, None] = 'c68b3f96c626'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('game_sessions', sa.Column('request_id', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_game_sessions_request_id'), 'game_sessions', ['request_id'], unique=True)
+    op.add_column('quarantined_sessions', sa.Column('request_id', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_quarantined_sessions_request_id'), 'quarantined_sessions', ['request_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_quarantined_sessions_request_id'), table_name='quarantined_sessions')
+    with op.batch_alter_table('quarantined_sessions') as batch_op:
+        batch_op.drop_column('request_id')
+    op.drop_index(op.f('ix_game_sessions_request_id'), table_name='game_sessions')
+    with op.batch_alter_table('game_sessions') as batch_op:
+        batch_op.drop_column('request_id')
@@ -0,0 +1,45 @@
+"""add rank tie break
+
+Adds the tie_break column and replaces the score index with one over the
+full sort key (total_score, tie_break, user_id).
+
+Revision ID: 4c8d2e6a1f57
+Revises: e71d4b2a9f03
+Create Date: 2026-10-18 19:47:12.508314
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c8d2e6a1f57'
+down_revision: Union[str, None] = 'e71d4b2a9f03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing scores count as reached before any tracked achievement time
+    for table in ('leaderboard', 'leaderboard_staging'):
+        op.add_column(table, sa.Column('tie_break', sa.Float(), nullable=False, server_default='0'))
+    op.drop_index('idx_leaderboard_score_user', table_name='leaderboard')
+    op.create_index(
+        'idx_leaderboard_rank_key',
+        'leaderboard',
+        [sa.text('total_score DESC'), sa.text('tie_break DESC'), sa.text('user_id DESC')],
+        unique=False,
+        postgresql_include=['rank'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_leaderboard_rank_key', table_name='leaderboard')
+    op.create_index('idx_leaderboard_score_user', 'leaderboard', [sa.text('total_score DESC'), 'user_id'], unique=False, postgresql_include=['rank'])
+    for table in ('leaderboard_staging', 'leaderboard'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('tie_break')
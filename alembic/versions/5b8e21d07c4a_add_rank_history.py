@@ -0,0 +1,47 @@
+"""add rank history
+
+Revision ID: 5b8e21d07c4a
+Revises: 11e40741e08d
+Create Date: 2026-10-18 17:05:41.318920
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b8e21d07c4a'
+down_revision: Union[str, None] = '11e40741e08d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('leaderboard', sa.Column('changed_at', sa.DateTime(), nullable=True))
+    # Mark every existing player so the first snapshot records all of them
+    op.get_bind().execute(
+        sa.text('UPDATE leaderboard SET changed_at = :now'), {'now': datetime.utcnow()}
+    )
+    op.create_index('idx_leaderboard_changed_at', 'leaderboard', ['changed_at'], unique=False)
+    op.create_table('rank_history',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.Date(), nullable=False),
+    sa.Column('samples', sa.LargeBinary(), nullable=False),
+    sa.Column('last_at', sa.DateTime(), nullable=False),
+    sa.Column('last_rank', sa.Integer(), nullable=False),
+    sa.Column('last_score', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'period')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('rank_history')
+    op.drop_index('idx_leaderboard_changed_at', table_name='leaderboard')
+    with op.batch_alter_table('leaderboard') as batch_op:
+        batch_op.drop_column('changed_at')
@@ -0,0 +1,34 @@
+"""scope request_id to player
+
+Idempotency keys are unique per player rather than across all players.
+
+Revision ID: 7a2c9e4b1d36
+Revises: 9d3b7f1c5e82
+Create Date: 2026-10-18 23:41:17.402583
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a2c9e4b1d36'
+down_revision: Union[str, None] = '9d3b7f1c5e82'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ('game_sessions', 'quarantined_sessions'):
+        op.drop_index(f'ix_{table}_request_id', table_name=table)
+        op.create_index(f'uq_{table}_user_request', table, ['user_id', 'request_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('game_sessions', 'quarantined_sessions'):
+        op.drop_index(f'uq_{table}_user_request', table_name=table)
+        op.create_index(f'ix_{table}_request_id', table, ['request_id'], unique=True)
@@ -0,0 +1,46 @@
+"""add scoring rule state
+
+Revision ID: 885c25995959
+Revises: 392acba75709
+Create Date: 2026-10-18 14:26:18.502467
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '885c25995959'
+down_revision: Union[str, None] = '392acba75709'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rows keep scoring_rule NULL and are converted by the background
+    # backfill (or lazily on the player's next submission).
+    for table in ('leaderboard', 'leaderboard_staging'):
+        op.add_column(table, sa.Column('total_sessions', sa.Integer(), nullable=False, server_default='0'))
+        op.add_column(table, sa.Column('rule_state', sa.Text(), nullable=True))
+        op.add_column(table, sa.Column('scoring_rule', sa.String(length=32), nullable=True))
+    op.add_column('rebuild_checkpoints', sa.Column('session_watermark', sa.Integer(), nullable=True))
+    op.create_table('leaderboard_meta',
+    sa.Column('key', sa.String(length=64), nullable=False),
+    sa.Column('value', sa.String(length=255), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('leaderboard_meta')
+    with op.batch_alter_table('rebuild_checkpoints') as batch_op:
+        batch_op.drop_column('session_watermark')
+    for table in ('leaderboard_staging', 'leaderboard'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('scoring_rule')
+            batch_op.drop_column('rule_state')
+            batch_op.drop_column('total_sessions')
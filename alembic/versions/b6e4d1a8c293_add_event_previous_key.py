@@ -0,0 +1,34 @@
+"""add event previous key
+
+Score events carry the player's previous rank key, so that any worker can
+apply them to the stored ranks.
+
+Revision ID: b6e4d1a8c293
+Revises: 7a2c9e4b1d36
+Create Date: 2026-10-19 00:12:48.913552
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e4d1a8c293'
+down_revision: Union[str, None] = '7a2c9e4b1d36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('leaderboard_events', sa.Column('previous_score', sa.Float(), nullable=True))
+    op.add_column('leaderboard_events', sa.Column('previous_tie_break', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('leaderboard_events', table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        batch_op.drop_column('previous_tie_break')
+        batch_op.drop_column('previous_score')
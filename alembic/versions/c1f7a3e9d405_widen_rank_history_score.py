@@ -0,0 +1,32 @@
+"""widen rank history score
+
+last_score holds total_score in hundredths, which does not fit in 32 bits.
+
+Revision ID: c1f7a3e9d405
+Revises: b6e4d1a8c293
+Create Date: 2026-10-19 00:38:06.271944
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c1f7a3e9d405'
+down_revision: Union[str, None] = 'b6e4d1a8c293'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('rank_history') as batch_op:
+        batch_op.alter_column('last_score', existing_type=sa.Integer(), type_=sa.BigInteger(), existing_nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('rank_history') as batch_op:
+        batch_op.alter_column('last_score', existing_type=sa.BigInteger(), type_=sa.Integer(), existing_nullable=False)
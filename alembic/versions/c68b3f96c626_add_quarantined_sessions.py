@@ -0,0 +1,41 @@
+"""add quarantined_sessions
+
+Revision ID: c68b3f96c626
+Revises: dce783834f69
+Create Date: 2026-10-18 09:12:41.305512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c68b3f96c626'
+down_revision: Union[str, None] = 'dce783834f69'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('quarantined_sessions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Integer(), nullable=False),
+    # The gamemode type already exists on PostgreSQL (created for game_sessions)
+    sa.Column('game_mode', postgresql.ENUM('SOLO', 'TEAM', name='gamemode', create_type=False), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.Column('z_score', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_quarantined_sessions_user_id'), 'quarantined_sessions', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_quarantined_sessions_user_id'), table_name='quarantined_sessions')
+    op.drop_table('quarantined_sessions')
@@ -0,0 +1,57 @@
+"""rank from ranked key
+
+Stored ranks are maintained against their own copy of each player's rank
+key, and change events wait in a pending table until the rank maintainer
+sequences them, so submits no longer serialise on the outbox lock. Ranks
+are rebuilt by the first flush after the upgrade.
+
+Revision ID: e5a0c7d3b918
+Revises: c1f7a3e9d405
+Create Date: 2026-10-19 09:14:37.502816
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a0c7d3b918'
+down_revision: Union[str, None] = 'c1f7a3e9d405'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('leaderboard', sa.Column('ranked_score', sa.Float(), nullable=True))
+    op.add_column('leaderboard', sa.Column('ranked_tie_break', sa.Float(), nullable=True))
+    op.create_index('idx_leaderboard_ranked_key', 'leaderboard', [sa.text('ranked_score DESC'), sa.text('ranked_tie_break DESC'), sa.text('user_id DESC')], unique=False, postgresql_include=['rank'])
+    op.create_table('leaderboard_pending_events',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=16), nullable=False),
+    sa.Column('total_score', sa.Float(), nullable=True),
+    sa.Column('rank', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # Batch mode rebuilds the table on SQLite; keep seqs from being reused
+    with op.batch_alter_table('leaderboard_events', table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        batch_op.drop_column('previous_tie_break')
+        batch_op.drop_column('previous_score')
+    # The seq cursor is replaced by the ranked key; rank everything once
+    op.execute("DELETE FROM leaderboard_meta WHERE key = 'ranked_seq'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('leaderboard_events', sa.Column('previous_score', sa.Float(), nullable=True))
+    op.add_column('leaderboard_events', sa.Column('previous_tie_break', sa.Float(), nullable=True))
+    op.drop_table('leaderboard_pending_events')
+    op.drop_index('idx_leaderboard_ranked_key', table_name='leaderboard')
+    with op.batch_alter_table('leaderboard') as batch_op:
+        batch_op.drop_column('ranked_tie_break')
+        batch_op.drop_column('ranked_score')
+    op.execute("DELETE FROM leaderboard_meta WHERE key = 'ranks_maintained'")
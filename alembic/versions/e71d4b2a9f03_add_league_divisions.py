@@ -0,0 +1,44 @@
+"""add league divisions
+
+Revision ID: e71d4b2a9f03
+Revises: a3f9c0d61e27
+Create Date: 2026-10-18 19:02:33.181245
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e71d4b2a9f03'
+down_revision: Union[str, None] = 'a3f9c0d61e27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Players are placed by the first update-leagues run (or on their next
+    # submission in league mode)
+    for table in ('leaderboard', 'leaderboard_staging'):
+        op.add_column(table, sa.Column('tier', sa.Integer(), nullable=True))
+        op.add_column(table, sa.Column('division', sa.Integer(), nullable=True))
+        op.add_column(table, sa.Column('division_rank', sa.Integer(), nullable=True))
+    op.create_index(
+        'idx_leaderboard_division',
+        'leaderboard',
+        ['tier', 'division', sa.text('total_score DESC')],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_leaderboard_division', table_name='leaderboard')
+    for table in ('leaderboard_staging', 'leaderboard'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('division_rank')
+            batch_op.drop_column('division')
+            batch_op.drop_column('tier')
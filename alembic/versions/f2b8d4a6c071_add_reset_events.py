@@ -0,0 +1,34 @@
+"""add reset events
+
+A "reset" event in the change feed tells consumers that a job rewrote the
+whole board; it names no player.
+
+Revision ID: f2b8d4a6c071
+Revises: e5a0c7d3b918
+Create Date: 2026-10-19 11:02:53.418207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b8d4a6c071'
+down_revision: Union[str, None] = 'e5a0c7d3b918'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('leaderboard_events', table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        batch_op.alter_column('user_id', existing_type=sa.Integer(), nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM leaderboard_events WHERE user_id IS NULL")
+    with op.batch_alter_table('leaderboard_events', table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        batch_op.alter_column('user_id', existing_type=sa.Integer(), nullable=False)
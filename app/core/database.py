@@ -1,20 +1,28 @@
+import asyncio
+import functools
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import QueuePool
 from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable is not set")
 
+# Connections: POOL_SIZE kept open, up to MAX_OVERFLOW more under load
+POOL_SIZE = 20
+MAX_OVERFLOW = 40
+
 engine = create_engine(
     DATABASE_URL,
     poolclass=QueuePool,
-    pool_size=20,
-    max_overflow=40,
+    pool_size=POOL_SIZE,
+    max_overflow=MAX_OVERFLOW,
     pool_timeout=30,
     pool_recycle=1800,
     connect_args=(
@@ -31,3 +39,25 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# SQLite has a single writer: threads writing at once would only take turns
+# through its busy-timeout sleeps, so on SQLite all database work of
+# requests goes through one thread instead
+_sqlite_thread = (
+    ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+    if DATABASE_URL.startswith("sqlite")
+    else None
+)
+
+
+async def run_db(func, *args):
+    """
+    Run blocking database work off the event loop, so a call waiting for a
+    lock holds up only its own request.
+    """
+    if _sqlite_thread is None:
+        return await run_in_threadpool(func, *args)
+    return await asyncio.get_running_loop().run_in_executor(
+        _sqlite_thread, functools.partial(func, *args)
+    )
@@ -1,3 +1,6 @@
+import asyncio
+import logging
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -5,12 +8,18 @@ from fastapi_cache import FastAPICache
 from fastapi_cache.backends.redis import RedisBackend
 from redis import Redis
 
-from app.routers import leaderboard
-from app.core.database import engine
+from app.routers import groups, leaderboard
+from app.core.database import SessionLocal, engine
 from app.models import Base
+from app.services.leagues import convert_league_mode, league_mode_changed
+from app.services.rank_maintenance import rank_maintainer
+from app.services.ranking import convert_rank_mode, rank_mode_changed
+from app.services.scoring import backfill_scoring_rule, scoring_rule_changed
 
 Base.metadata.create_all(bind=engine)
 
+logger = logging.getLogger(__name__)
+
 app = FastAPI(
     title="Gaming Leaderboard API",
     description="A high-performance gaming leaderboard API",
@@ -23,6 +32,62 @@ async def startup():
     FastAPICache.init(RedisBackend(redis), prefix="fastapi-cache:")
 
 
+def run_in_background(job):
+    """Run a blocking job in the default executor, logging it if it fails."""
+    def log_failure(future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("Background job %s failed", job.__name__, exc_info=future.exception())
+
+    asyncio.get_running_loop().run_in_executor(None, job).add_done_callback(log_failure)
+
+
+@app.on_event("startup")
+async def start_scoring_backfill():
+    # Re-aggregate existing players in the background when SCORING_RULE changed
+    db = SessionLocal()
+    try:
+        changed = scoring_rule_changed(db)
+    finally:
+        db.close()
+    if changed:
+        run_in_background(backfill_scoring_rule)
+
+
+@app.on_event("startup")
+async def start_rank_mode_conversion():
+    # Re-rank everyone in the background when RANK_MODE or RANK_TIE_BREAK changed
+    db = SessionLocal()
+    try:
+        changed = rank_mode_changed(db)
+    finally:
+        db.close()
+    if changed:
+        run_in_background(convert_rank_mode)
+
+
+@app.on_event("startup")
+async def start_league_mode_conversion():
+    # Re-rank everyone in the background when LEAGUE_MODE changed
+    db = SessionLocal()
+    try:
+        changed = league_mode_changed(db)
+    finally:
+        db.close()
+    if changed:
+        run_in_background(convert_league_mode)
+
+
+@app.on_event("startup")
+async def flush_pending_rank_updates():
+    # Events a stopped worker queued but never applied
+    rank_maintainer.schedule()
+
+
+@app.on_event("shutdown")
+async def flush_rank_updates():
+    await rank_maintainer.flush()
+
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -33,6 +98,7 @@ app.add_middleware(
 
 # Include routers
 app.include_router(leaderboard.router)
+app.include_router(groups.router)
 
 @app.get("/")
 async def root():
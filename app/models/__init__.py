@@ -4,6 +4,32 @@ Base = declarative_base()
 
 # Import all models to ensure they're registered with the Base
 from .users import User
-from .leaderboard import GameSession, Leaderboard
+from .leaderboard import (
+    GameSession,
+    GroupMember,
+    Leaderboard,
+    LeaderboardEvent,
+    LeaderboardMeta,
+    LeaderboardStaging,
+    PendingLeaderboardEvent,
+    PlayerGroup,
+    QuarantinedSession,
+    RankHistory,
+    RebuildCheckpoint,
+)
 
-__all__ = ["Base", "User", "GameSession", "Leaderboard"]
\ No newline at end of file
+__all__ = [
+    "Base",
+    "User",
+    "GameSession",
+    "GroupMember",
+    "Leaderboard",
+    "LeaderboardEvent",
+    "LeaderboardMeta",
+    "LeaderboardStaging",
+    "PendingLeaderboardEvent",
+    "PlayerGroup",
+    "QuarantinedSession",
+    "RankHistory",
+    "RebuildCheckpoint",
+]
\ No newline at end of file
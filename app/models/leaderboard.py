@@ -1,7 +1,20 @@
 import enum
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Enum, Float, ForeignKey, Index, Integer, String
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Date,
+    DateTime,
+    Enum,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+)
 from sqlalchemy.orm import relationship
 
 from . import Base
@@ -15,36 +28,225 @@ class GameMode(enum.Enum):
 class GameSession(Base):
     __tablename__ = "game_sessions"
 
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
-    score = Column(Integer, nullable=False, index=True)
-    game_mode = Column(
-        Enum(GameMode), nullable=False, default=GameMode.SOLO, index=True
-    )
-    timestamp = Column(
-        DateTime, default=datetime.utcnow, nullable=False, index=True
-    )
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    score = Column(Integer, nullable=False)
+    game_mode = Column(Enum(GameMode), nullable=False, default=GameMode.SOLO)
+    timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Client-supplied idempotency key, unique per player; retries carrying
+    # the same key are dropped
+    request_id = Column(String(64), nullable=True)
 
     user = relationship("User", back_populates="game_sessions")
 
+    # Every insert pays for each index here, so only indexes with a reader
+    # are kept: idx_user_score serves per-user lookups and aggregation
+    # (covering COUNT/SUM(score)), uq_game_sessions_user_request serves
+    # idempotency checks.
     __table_args__ = (
         Index("idx_user_score", user_id, score.desc()),
-        Index(
-            "idx_timestamp_score", timestamp.desc(), score.desc()
-        ),
+        Index("uq_game_sessions_user_request", user_id, request_id, unique=True),
+    )
+
+
+class QuarantinedSession(Base):
+    """
+    Submissions flagged by the anti-cheat check. They are kept out of
+    game_sessions (and therefore out of leaderboard aggregates) until cleared.
+    """
+
+    __tablename__ = "quarantined_sessions"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
+    score = Column(Integer, nullable=False)
+    game_mode = Column(Enum(GameMode), nullable=False, default=GameMode.SOLO)
+    timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
+    z_score = Column(Float, nullable=False)
+    request_id = Column(String(64), nullable=True)
+
+    __table_args__ = (
+        Index("uq_quarantined_sessions_user_request", user_id, request_id, unique=True),
     )
 
 
 class Leaderboard(Base):
     __tablename__ = "leaderboard"
 
-    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True, index=True)
-    total_score = Column(Float, default=0.0, index=True)
-    rank = Column(Integer, nullable=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total_score = Column(Float, default=0.0)
+    rank = Column(Integer, nullable=True)
+    total_sessions = Column(Integer, nullable=False, default=0, server_default="0")
+    # Per-player state of the scoring rule that produced total_score (JSON)
+    rule_state = Column(Text, nullable=True)
+    scoring_rule = Column(String(32), nullable=True)
+    # Orders players with equal total_score; larger wins (see
+    # app.services.ranking.tie_break_for)
+    tie_break = Column(Float, nullable=False, default=0.0, server_default="0")
+    # Last time total_score or rank changed; rank snapshots only visit
+    # players changed since the previous snapshot
+    changed_at = Column(DateTime, nullable=True)
+    # League mode (app.services.leagues): tier 1 is the best; divisions are
+    # numbered per tier and hold at most LEAGUE_DIVISION_SIZE players
+    tier = Column(Integer, nullable=True)
+    division = Column(Integer, nullable=True)
+    division_rank = Column(Integer, nullable=True)
+    # The (total_score, tie_break) that `rank` was computed from. Only the
+    # rank maintainer and whole-board jobs write these, so they can place
+    # players while submits keep changing total_score (see
+    # app.services.ranking.apply_rank_moves); NULL until first ranked
+    ranked_score = Column(Float, nullable=True)
+    ranked_tie_break = Column(Float, nullable=True)
 
     user = relationship("User", back_populates="leaderboard_entry")
 
-    # Add index for sorting by score (for leaderboard queries)
+    # idx_leaderboard_rank_key is the board order, for /top and exports;
+    # idx_leaderboard_ranked_key the order of the stored ranks, for rank
+    # counting and placing movers. On PostgreSQL both carry rank, so /top
+    # and neighbour lookups are served by index-only scans.
+    __table_args__ = (
+        Index(
+            "idx_leaderboard_rank_key",
+            total_score.desc(),
+            tie_break.desc(),
+            user_id.desc(),
+            postgresql_include=["rank"],
+        ),
+        Index(
+            "idx_leaderboard_ranked_key",
+            ranked_score.desc(),
+            ranked_tie_break.desc(),
+            user_id.desc(),
+            postgresql_include=["rank"],
+        ),
+        Index("idx_leaderboard_changed_at", changed_at),
+        Index("idx_leaderboard_division", tier, division, total_score.desc()),
+    )
+
+
+class LeaderboardStaging(Base):
+    """
+    Scratch copy of the leaderboard filled by the offline rebuild job and
+    swapped into `leaderboard` in a single transaction when complete.
+    """
+
+    __tablename__ = "leaderboard_staging"
+
+    user_id = Column(Integer, primary_key=True)
+    total_score = Column(Float, nullable=False)
+    rank = Column(Integer, nullable=True)
+    total_sessions = Column(Integer, nullable=False, default=0, server_default="0")
+    rule_state = Column(Text, nullable=True)
+    scoring_rule = Column(String(32), nullable=True)
+    tie_break = Column(Float, nullable=False, default=0.0, server_default="0")
+    # Carried over from the live leaderboard at swap time
+    tier = Column(Integer, nullable=True)
+    division = Column(Integer, nullable=True)
+    division_rank = Column(Integer, nullable=True)
+
+
+class RebuildCheckpoint(Base):
+    """
+    Progress of a chunked rebuild: every user id up to last_user_id has been
+    aggregated into the staging table.
+    """
+
+    __tablename__ = "rebuild_checkpoints"
+
+    job = Column(String(64), primary_key=True)
+    last_user_id = Column(Integer, nullable=False, default=0)
+    # Highest game_sessions.id when the job started; later sessions are
+    # re-aggregated before the swap
+    session_watermark = Column(Integer, nullable=True)
+    started_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class LeaderboardMeta(Base):
+    """Small key/value store for leaderboard-wide settings, e.g. the active scoring rule."""
+
+    __tablename__ = "leaderboard_meta"
+
+    key = Column(String(64), primary_key=True)
+    value = Column(String(255), nullable=False)
+
+
+class RankHistory(Base):
+    """
+    A player's rank and score over one calendar month, as delta-encoded
+    samples (see app.services.rank_history). The last sample is kept in
+    plain columns so a snapshot can append without decoding the series.
+    """
+
+    __tablename__ = "rank_history"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    period = Column(Date, primary_key=True)
+    samples = Column(LargeBinary, nullable=False)
+    last_at = Column(DateTime, nullable=False)
+    last_rank = Column(Integer, nullable=False)
+    # Hundredths of total_score, which outgrows 32 bits (decaying rules)
+    last_score = Column(BigInteger, nullable=False)
+
+
+class PlayerGroup(Base):
+    """A friend list, guild or any other set of players with its own leaderboard."""
+
+    __tablename__ = "player_groups"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(255), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class GroupMember(Base):
+    __tablename__ = "group_members"
+
+    group_id = Column(Integer, ForeignKey("player_groups.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+
+    # The primary key serves member listings; this one finds a player's
+    # groups when their score changes
     __table_args__ = (
-        Index("idx_leaderboard_score", total_score.desc()),
+        Index("idx_group_members_user", user_id, group_id),
     )
+
+
+class PendingLeaderboardEvent(Base):
+    """
+    Change events written in the same transaction as the change itself,
+    waiting to be moved into leaderboard_events by the rank maintainer
+    (see app.services.outbox). Writers never wait for each other here.
+    """
+
+    __tablename__ = "leaderboard_pending_events"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False)
+    kind = Column(String(16), nullable=False)
+    total_score = Column(Float, nullable=True)
+    rank = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class LeaderboardEvent(Base):
+    """
+    Change log read by consumers by seq range (see app.services.outbox).
+    Only holders of the outbox lock append to it, so seqs become visible in
+    order; rows are never updated.
+    """
+
+    __tablename__ = "leaderboard_events"
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    # NULL for "reset"
+    user_id = Column(Integer, nullable=True)
+    # "score", "rank", in league mode "division_rank", or "reset" after a
+    # job rewrote the whole board (see app.services.outbox.log_reset)
+    kind = Column(String(16), nullable=False)
+    total_score = Column(Float, nullable=True)
+    rank = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Never reuse a seq, even after the newest events were deleted
+    __table_args__ = {"sqlite_autoincrement": True}
@@ -6,7 +6,7 @@ from . import Base
 class User(Base):
     __tablename__ = 'users'
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     username = Column(String(255), unique=True, index=True, nullable=False)
     join_date = Column(DateTime, default=datetime.utcnow, nullable=False)
     
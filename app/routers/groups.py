@@ -0,0 +1,187 @@
+from typing import List
+
+from app.core.database import get_db
+from app.models import GroupMember, Leaderboard, PlayerGroup, User
+from app.schemas import GroupCreate, GroupMembers, GroupResponse, LeaderboardEntry, PlayerRank
+from app.services.groups import group_boards
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+router = APIRouter(prefix="/api/leaderboard/group", tags=["groups"])
+
+
+@router.post("/", response_model=GroupResponse)
+async def create_group(group: GroupCreate, db: Session = Depends(get_db)):
+    """
+    Create a group (friend list, guild, ...) with an optional initial member list.
+    """
+    try:
+        player_group = PlayerGroup(name=group.name)
+        db.add(player_group)
+        db.flush()
+        _add_members(db, player_group.id, group.user_ids)
+        db.commit()
+        # A read made before the group existed may have left a board behind
+        group_boards.discard(player_group.id)
+        return _group_response(db, player_group)
+
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create group: {str(e)}",
+        )
+
+
+@router.post("/{group_id}/members", response_model=GroupResponse)
+async def add_group_members(
+    group_id: int, members: GroupMembers, db: Session = Depends(get_db)
+):
+    """
+    Add players to a group; players already in it are left as they are.
+    """
+    player_group = _get_group(db, group_id)
+    try:
+        _add_members(db, group_id, members.user_ids)
+        db.commit()
+        group_boards.discard(group_id)
+        return _group_response(db, player_group)
+
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to add group members: {str(e)}",
+        )
+
+
+@router.delete("/{group_id}/members/{user_id}")
+async def remove_group_member(group_id: int, user_id: int, db: Session = Depends(get_db)):
+    """
+    Remove a player from a group.
+    """
+    deleted = (
+        db.query(GroupMember)
+        .filter(GroupMember.group_id == group_id, GroupMember.user_id == user_id)
+        .delete()
+    )
+    db.commit()
+    if not deleted:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"User {user_id} is not a member of group {group_id}",
+        )
+    group_boards.discard(group_id)
+    return {"message": "Group member removed"}
+
+
+@router.get("/{group_id}/top", response_model=List[LeaderboardEntry])
+async def get_group_top(group_id: int, limit: int = 10, db: Session = Depends(get_db)):
+    """
+    Get the top players of a group, ranked within the group like /top.
+    """
+    board = group_boards.get(db, group_id)
+    if not board:
+        _get_group(db, group_id)
+        return []
+
+    cached = board.cached_top(limit)
+    if cached is not None:
+        return cached
+
+    top = board.top(limit)
+    usernames = dict(
+        db.query(User.id, User.username).filter(User.id.in_([user_id for user_id, _, _ in top]))
+    )
+    response = [
+        LeaderboardEntry(
+            user_id=user_id,
+            username=usernames.get(user_id, ""),
+            total_score=total_score,
+            rank=rank,
+        )
+        for user_id, total_score, rank in top
+    ]
+    board.cache_top(limit, response)
+    return response
+
+
+@router.get("/{group_id}/rank/{user_id}", response_model=PlayerRank)
+async def get_group_rank(group_id: int, user_id: int, db: Session = Depends(get_db)):
+    """
+    Get a player's rank within a group.
+    """
+    placement = group_boards.get(db, group_id).rank(user_id)
+    if placement is None:
+        _get_group(db, group_id)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"User {user_id} is not a member of group {group_id}",
+        )
+
+    rank, total_score = placement
+    player = (
+        db.query(User.username, Leaderboard.total_sessions)
+        .outerjoin(Leaderboard, Leaderboard.user_id == User.id)
+        .filter(User.id == user_id)
+        .first()
+    )
+    return PlayerRank(
+        user_id=user_id,
+        username=player.username,
+        rank=rank,
+        total_score=total_score,
+        total_sessions=player.total_sessions or 0,
+    )
+
+
+def _get_group(db: Session, group_id: int) -> PlayerGroup:
+    player_group = db.get(PlayerGroup, group_id)
+    if player_group is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Group {group_id} not found",
+        )
+    return player_group
+
+
+def _add_members(db: Session, group_id: int, user_ids: List[int]):
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return
+
+    known = {user_id for (user_id,) in db.query(User.id).filter(User.id.in_(user_ids))}
+    missing = [user_id for user_id in user_ids if user_id not in known]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Users not found: {missing[:10]}",
+        )
+
+    db.execute(
+        text(
+            """
+            INSERT INTO group_members (group_id, user_id)
+            VALUES (:group_id, :user_id)
+            ON CONFLICT DO NOTHING
+            """
+        ),
+        [{"group_id": group_id, "user_id": user_id} for user_id in user_ids],
+    )
+
+
+def _group_response(db: Session, player_group: PlayerGroup) -> GroupResponse:
+    member_count = (
+        db.query(func.count())
+        .select_from(GroupMember)
+        .filter(GroupMember.group_id == player_group.id)
+        .scalar()
+    )
+    return GroupResponse(id=player_group.id, name=player_group.name, member_count=member_count)
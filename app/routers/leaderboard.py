@@ -1,119 +1,181 @@
-from datetime import datetime
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta, timezone
 from enum import Enum
 from functools import lru_cache
-from typing import List
+from typing import List, NamedTuple, Optional
 
-from app.core.database import get_db
-from app.models import GameSession, Leaderboard, User
+from app.core.database import get_db, run_db
+from app.models import GameSession, Leaderboard, QuarantinedSession, User
 from app.schemas import (
+    ChangeEvent,
+    ChangesResponse,
     ErrorResponse,
     LeaderboardEntry,
     PlayerRank,
+    QuarantinedSessionEntry,
+    RankHistoryPoint,
     ScoreResponse,
     ScoreSubmission,
 )
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from app.services.anti_cheat import Verdict, score_validator
+from app.services.broadcast import leaderboard_hub
+from app.services.coalescing import SubmissionCoalescer
+from app.services.export import MEDIA_TYPES, export_chunks
+from app.services.groups import group_boards
+from app.services.idempotency import submission_cache
+from app.services.leagues import LEAGUE_MODE
+from app.services.outbox import (
+    CHANGES_BATCH_SIZE,
+    CHANGES_MAX_WAIT,
+    append_events,
+    retained_from,
+    wait_for_events,
+)
+from app.services.rank_history import read_history
+from app.services.rate_limit import (
+    client_identity,
+    retry_after_header,
+    submit_gate,
+    submit_limiter,
+)
+from app.services.rank_maintenance import rank_maintainer
+from app.services.ranking import (
+    RANK_MODE,
+    RANK_TIE_BREAK,
+    RankKey,
+    ranks_in_order,
+    recompute_ranks,
+    tie_break_for,
+)
+from app.services.scoring import active_rule, aggregate_users
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from fastapi_cache import FastAPICache
 from fastapi_cache.backends.redis import RedisBackend
 from fastapi_cache.decorator import cache
 from redis import Redis
-from sqlalchemy import desc, func, text
+from sqlalchemy import desc, text
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 router = APIRouter(prefix="/api/leaderboard", tags=["leaderboard"])
 
+STREAM_KEEPALIVE_SECONDS = 15
+
+# Window returned by /history when `from` is not given
+HISTORY_DEFAULT_DAYS = 30
+
+# Largest `limit` accepted by /top; full boards go through /export
+TOP_MAX_LIMIT = int(os.getenv("TOP_MAX_LIMIT", "1000"))
+
 class GameMode(Enum):
     SOLO = "SOLO"
     TEAM = "TEAM"
 
 
-@router.post("/submit", response_model=ScoreResponse)
+class PendingSession(NamedTuple):
+    score: int
+    game_mode: str
+    timestamp: datetime
+    request_id: Optional[str]
+
+
+class AppliedSession(NamedTuple):
+    total_sessions: int
+    total_score: float
+    # (total_score, tie_break) after the session
+    key: RankKey
+
+
+async def guard_submit(request: Request, submission: ScoreSubmission):
+    """
+    Rate limits per client (see client_identity) and per user_id, then the admission gate.
+    Both reject straight away (429 / 503 with Retry-After), before the
+    submission gets near a database connection. A retry that submission_cache
+    already answers passes without spending a token.
+    """
+    key = (submission.user_id, submission.request_id)
+    if submission.request_id and submission_cache.get(key) is not None:
+        yield
+        return
+    wait = submit_limiter.retry_after(client_identity(request), submission.user_id)
+    if wait:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many submissions; slow down",
+            headers=retry_after_header(wait),
+        )
+    if not submit_gate.try_enter():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many submissions in progress; try again shortly",
+            headers=retry_after_header(1),
+        )
+    try:
+        yield
+    finally:
+        submit_gate.leave()
+
+
+@router.post("/submit", response_model=ScoreResponse, dependencies=[Depends(guard_submit)])
 async def submit_score(
     submission: ScoreSubmission,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
 ):
-    try:
-        user_and_leaderboard = (
-            db.query(User, Leaderboard)
-            .outerjoin(Leaderboard, User.id == Leaderboard.user_id)
-            .filter(User.id == submission.user_id)
-            .first()
-        )
+    if submission.request_id:
+        cached_response = submission_cache.get((submission.user_id, submission.request_id))
+        if cached_response is not None:
+            return cached_response
 
-        if not user_and_leaderboard or not user_and_leaderboard[0]:
+    try:
+        if not await run_db(_user_exists, db, submission.user_id):
             raise HTTPException(
                 status_code=404, detail=f"User with ID {submission.user_id} not found"
             )
 
-        with db.begin_nested():
-
-            game_mode_str = "SOLO" if submission.game_mode.lower() == "solo" else "TEAM"
-            db.execute(
-                text(
-                    """
-                    INSERT INTO game_sessions (user_id, score, game_mode, timestamp)
-                    VALUES (:user_id, :score, :game_mode, :timestamp)
-                    """
-                ),
-                {
-                    "user_id": submission.user_id,
-                    "score": submission.score,
-                    "game_mode": game_mode_str,
-                    "timestamp": datetime.utcnow(),
-                },
-            )
+        game_mode_str = "SOLO" if submission.game_mode.lower() == "solo" else "TEAM"
 
-            # Calculate stats
-            stats = db.execute(
-                text(
-                    """
-            SELECT COUNT(*) as total_sessions, AVG(score) as avg_score
-            FROM game_sessions
-            WHERE user_id = :user_id
-            """
-                ),
-                {"user_id": submission.user_id},
-            ).first()
-            total_sessions = stats[0]
-            avg_score = stats[1]
-
-            db.execute(
-                text(
-                    """
-            INSERT INTO leaderboard (user_id, total_score)
-            VALUES (:user_id, :avg_score)
-            ON CONFLICT(user_id) DO UPDATE SET total_score = :avg_score
-            """
-                ),
-                {"user_id": submission.user_id, "avg_score": avg_score},
+        verdict, z_score = score_validator.evaluate(
+            submission.user_id, game_mode_str, submission.score
+        )
+        if verdict is Verdict.REJECT:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Score rejected as an outlier",
             )
-
-            db.execute(
-                text(
-                    """
-                UPDATE leaderboard
-                SET rank = (
-                    SELECT COUNT(*) + 1
-                    FROM leaderboard AS l2
-                    WHERE l2.total_score > leaderboard.total_score
-                )
-                WHERE user_id = :user_id
-                """
-                ),
-                {"user_id": submission.user_id},
+        if verdict is Verdict.FLAG:
+            return await run_db(
+                _quarantine_submission, db, submission, game_mode_str, z_score
             )
 
-        db.commit()
+        # Submissions of a player who submits in bursts are written together
+        applied = await submission_coalescer.submit(
+            db,
+            submission.user_id,
+            PendingSession(
+                submission.score, game_mode_str, datetime.utcnow(), submission.request_id
+            ),
+        )
 
-        background_tasks.add_task(_update_single_player_rank, db, submission.user_id)
+        if applied is None:
+            # A retry whose original attempt already went through
+            return await run_db(
+                _original_response, db, submission.user_id, submission.request_id
+            )
 
-        return ScoreResponse(
+        score_validator.record(submission.user_id, game_mode_str, submission.score)
+
+        response = ScoreResponse(
             message="Score submitted successfully",
             user_id=submission.user_id,
             score=submission.score,
-            total_sessions=total_sessions,
+            total_sessions=applied.total_sessions,
         )
+        if submission.request_id:
+            submission_cache.put((submission.user_id, submission.request_id), response)
+        return response
 
     except HTTPException:
         raise
@@ -122,12 +184,32 @@ async def submit_score(
         raise HTTPException(status_code=500, detail=f"Failed to submit score: {str(e)}")
 
 
+def _leaderboard_cache_key(
+    func,
+    namespace: str = "",
+    *,
+    request: Optional[Request] = None,
+    response=None,
+    args: tuple,
+    kwargs: dict,
+) -> str:
+    """
+    Cache key from the query parameters and the rank mode. The per-request
+    `db` session is left out; with it in the key no two requests would match.
+    """
+    params = sorted((name, value) for name, value in kwargs.items() if name != "db")
+    return f"{namespace}:{func.__module__}:{func.__name__}:{RANK_MODE}:{RANK_TIE_BREAK}:{params}"
+
+
 @router.get("/top", response_model=List[LeaderboardEntry])
-@cache(expire=60)
-async def get_top_leaderboard(limit: int = 10, db: Session = Depends(get_db)):
+@cache(expire=60, key_builder=_leaderboard_cache_key)
+async def get_top_leaderboard(
+    limit: int = Query(10, ge=1, le=TOP_MAX_LIMIT), db: Session = Depends(get_db)
+):
     """
     Get the top players from the leaderboard.
-    Returns players sorted by total_score in descending order.
+    Returns players in rank order: by total_score descending, ties by the
+    configured tie-break. Use /export for more than TOP_MAX_LIMIT players.
     """
     try:
         top_players = (
@@ -138,7 +220,11 @@ async def get_top_leaderboard(limit: int = 10, db: Session = Depends(get_db)):
                 Leaderboard.rank,
             )
             .join(User, Leaderboard.user_id == User.id)
-            .order_by(desc(Leaderboard.total_score))
+            .order_by(
+                desc(Leaderboard.total_score),
+                desc(Leaderboard.tie_break),
+                desc(Leaderboard.user_id),
+            )
             .limit(limit)
             .all()
         )
@@ -146,14 +232,19 @@ async def get_top_leaderboard(limit: int = 10, db: Session = Depends(get_db)):
         if not top_players:
             return []
 
+        if LEAGUE_MODE:
+            # Stored global ranks wait for update-leagues; rank the run instead
+            ranks = ranks_in_order(player.total_score for player in top_players)
+        else:
+            ranks = (player.rank or 0 for player in top_players)
         return [
             LeaderboardEntry(
                 user_id=player.user_id,
                 username=player.username,
                 total_score=player.total_score,
-                rank=player.rank or 0,
+                rank=rank,
             )
-            for player in top_players
+            for player, rank in zip(top_players, ranks)
         ]
 
     except Exception as e:
@@ -163,6 +254,19 @@ async def get_top_leaderboard(limit: int = 10, db: Session = Depends(get_db)):
         )
 
 
+@router.get("/export")
+async def export_leaderboard(format: str = Query("ndjson", pattern="^(ndjson|csv)$")):
+    """
+    The whole board in rank order as NDJSON or CSV, streamed in batches from
+    a server-side cursor; memory use does not depend on the board size.
+    """
+    return StreamingResponse(
+        export_chunks(format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="leaderboard.{format}"'},
+    )
+
+
 @router.get("/rank/{user_id}", response_model=PlayerRank)
 async def get_player_rank(user_id: int, db: Session = Depends(get_db)):
     """
@@ -182,6 +286,10 @@ async def get_player_rank(user_id: int, db: Session = Depends(get_db)):
                 User.username,
                 Leaderboard.total_score,
                 Leaderboard.rank,
+                Leaderboard.total_sessions,
+                Leaderboard.tier,
+                Leaderboard.division,
+                Leaderboard.division_rank,
             )
             .join(User, Leaderboard.user_id == User.id)
             .filter(Leaderboard.user_id == user_id)
@@ -197,18 +305,15 @@ async def get_player_rank(user_id: int, db: Session = Depends(get_db)):
                 total_sessions=0,
             )
 
-        total_sessions = (
-            db.query(func.count(GameSession.id))
-            .filter(GameSession.user_id == user_id)
-            .scalar()
-        )
-
         return PlayerRank(
             user_id=player_entry.user_id,
             username=player_entry.username,
             rank=player_entry.rank or 0,
             total_score=player_entry.total_score,
-            total_sessions=total_sessions,
+            total_sessions=player_entry.total_sessions,
+            tier=player_entry.tier,
+            division=player_entry.division,
+            division_rank=player_entry.division_rank,
         )
 
     except HTTPException:
@@ -219,6 +324,109 @@ async def get_player_rank(user_id: int, db: Session = Depends(get_db)):
             detail=f"Failed to fetch player rank: {str(e)}",
         )
 
+@router.get("/history/{user_id}", response_model=List[RankHistoryPoint])
+async def get_rank_history(
+    user_id: int,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    db: Session = Depends(get_db),
+):
+    """
+    A player's rank and score over time, from the periodic rank snapshots.
+    Only snapshots where something changed are stored; a point holds until
+    the next one. Defaults to the last 30 days.
+    """
+    # Snapshots are stored in naive UTC
+    start, end = (
+        value.astimezone(timezone.utc).replace(tzinfo=None) if value and value.tzinfo else value
+        for value in (start, end)
+    )
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=HISTORY_DEFAULT_DAYS)
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="`from` must not be after `to`",
+        )
+
+    if db.query(User.id).filter(User.id == user_id).first() is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"User with ID {user_id} not found",
+        )
+
+    return [
+        RankHistoryPoint(timestamp=taken_at, rank=rank, total_score=total_score)
+        for taken_at, rank, total_score in read_history(db, user_id, start, end)
+    ]
+
+
+@router.get("/stream")
+async def stream_leaderboard(
+    request: Request,
+    user_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Server-Sent Events feed of leaderboard changes.
+    Starts with a `snapshot` of the top players, then sends `top` diffs
+    (entered/left/moved) and, when `user_id` is given, that player's `rank`.
+    """
+    subscriber = leaderboard_hub.subscribe(db, user_id)
+    snapshot = leaderboard_hub.snapshot()
+
+    async def event_stream():
+        try:
+            yield _sse("snapshot", snapshot)
+            while not await request.is_disconnected():
+                try:
+                    batch = await asyncio.wait_for(
+                        subscriber.next_batch(), timeout=STREAM_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                for event, data in batch.items():
+                    yield _sse(event, data)
+        finally:
+            leaderboard_hub.unsubscribe(subscriber)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.get("/changes", response_model=ChangesResponse)
+async def get_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(CHANGES_BATCH_SIZE, ge=1, le=CHANGES_BATCH_SIZE),
+    timeout: float = Query(25, ge=0, le=CHANGES_MAX_WAIT),
+):
+    """
+    Score and rank changes after sequence number `since`, oldest first.
+    Long-polls: with nothing new, waits up to `timeout` seconds for the next
+    change. Reads only the outbox table. Pass `next_seq` as `since` to resume.
+    Events are kept for a limited time (see prune_events); resuming from
+    before the oldest kept event fails with 410.
+    """
+    oldest = retained_from()
+    if since < oldest - 1:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail=(
+                f"Events before seq {oldest} have been pruned; reload the board "
+                f"(e.g. from /export) and resume with since={oldest - 1}"
+            ),
+        )
+    events = await wait_for_events(since, limit, timeout)
+    return ChangesResponse(
+        events=[ChangeEvent(**event._mapping) for event in events],
+        next_seq=events[-1].seq if events else since,
+    )
+
+
 @router.post("/create/", response_model=List[int])
 def create_test_users(count: int = 1000000, db: Session = Depends(get_db)):
     try:
@@ -256,85 +464,354 @@ def create_test_users(count: int = 1000000, db: Session = Depends(get_db)):
         return []
 
 
-async def _update_leaderboard_ranks(db: Session):
+@router.get("/quarantine", response_model=List[QuarantinedSessionEntry])
+async def list_quarantined_sessions(limit: int = 100, db: Session = Depends(get_db)):
     """
-    Helper function to update ranks for all players in the leaderboard.
+    List submissions held back by the anti-cheat check, oldest first.
+    """
+    sessions = (
+        db.query(QuarantinedSession)
+        .order_by(QuarantinedSession.id)
+        .limit(limit)
+        .all()
+    )
+    return [
+        QuarantinedSessionEntry(
+            id=session.id,
+            user_id=session.user_id,
+            score=session.score,
+            game_mode=session.game_mode.value,
+            timestamp=session.timestamp,
+            z_score=session.z_score,
+        )
+        for session in sessions
+    ]
+
+
+@router.post("/quarantine/{session_id}/release", response_model=ScoreResponse)
+async def release_quarantined_session(session_id: int, db: Session = Depends(get_db)):
+    """
+    Clear a flagged submission so that it counts towards the leaderboard.
     """
     try:
-        if "sqlite" in str(db.bind.url):
-            db.execute(
-                text(
-                    """
-                WITH ranked_players AS (
-                    SELECT 
-                        user_id,
-                        total_score,
-                        RANK() OVER (ORDER BY total_score DESC) as new_rank
-                    FROM leaderboard
-                )
-                UPDATE leaderboard 
-                SET rank = (
-                    SELECT new_rank 
-                    FROM ranked_players 
-                    WHERE ranked_players.user_id = leaderboard.user_id
-                )
-            """
-                )
-            )
-        else:
-            db.execute(
-                text(
-                    """
-                UPDATE leaderboard 
-                SET rank = ranked_players.new_rank
-                FROM (
-                    SELECT 
-                        user_id,
-                        RANK() OVER (ORDER BY total_score DESC) as new_rank
-                    FROM leaderboard
-                ) ranked_players
-                WHERE leaderboard.user_id = ranked_players.user_id
-            """
-                )
+        session = db.get(QuarantinedSession, session_id)
+        if not session:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Quarantined session {session_id} not found",
             )
 
-        db.commit()
+        user_id, score, game_mode_str, request_id = (
+            session.user_id,
+            session.score,
+            session.game_mode.value,
+            session.request_id,
+        )
+        applied = await run_db(_release_session, db, session)
+        if applied is None:
+            return await run_db(_original_response, db, user_id, request_id)
+
+        score_validator.record(user_id, game_mode_str, score)
+        _publish_update(db, user_id, applied)
+
+        return ScoreResponse(
+            message="Quarantined score released",
+            user_id=user_id,
+            score=score,
+            total_sessions=applied.total_sessions,
+        )
 
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
-        raise e
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to release session: {str(e)}",
+        )
 
 
-def _update_single_player_rank(db: Session, user_id: int):
+@router.delete("/quarantine/{session_id}")
+async def discard_quarantined_session(session_id: int, db: Session = Depends(get_db)):
     """
-    Update rank for a single player without recalculating all ranks.
-    Much more efficient than updating all ranks.
+    Drop a flagged submission for good.
     """
-    try:
-
-        player_score = (
-            db.query(Leaderboard.total_score)
-            .filter(Leaderboard.user_id == user_id)
-            .scalar()
+    deleted = (
+        db.query(QuarantinedSession)
+        .filter(QuarantinedSession.id == session_id)
+        .delete()
+    )
+    db.commit()
+    if not deleted:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Quarantined session {session_id} not found",
+        )
+    return {"message": "Quarantined session discarded"}
+
+
+def _release_session(db: Session, session: QuarantinedSession) -> Optional[AppliedSession]:
+    """Move a quarantined session over to game_sessions and commit."""
+    request_id = session.request_id
+    with db.begin_nested():
+        # Clear the key first so it can move over to game_sessions
+        session.request_id = None
+        db.flush()
+        applied = _apply_session(
+            db,
+            session.user_id,
+            session.score,
+            session.game_mode.value,
+            session.timestamp,
+            request_id,
         )
+        db.delete(session)
+    db.commit()
+    return applied
+
+
+def _apply_session(
+    db: Session,
+    user_id: int,
+    score: int,
+    game_mode: str,
+    timestamp: datetime,
+    request_id: Optional[str] = None,
+) -> Optional[AppliedSession]:
+    """
+    Record a game session and refresh the player's leaderboard entry.
+    Must be called inside a transaction; returns the player's session count,
+    new total_score and rank key, or None if a session with the same
+    request_id was already recorded for the player. The rank is left to
+    rank_maintainer, which picks the change up from the outbox.
+    """
+    session = PendingSession(score, game_mode, timestamp, request_id)
+    return _apply_sessions(db, user_id, [session])[0]
 
-        if player_score is None:
-            return
 
-        higher_scores = (
-            db.query(func.count())
-            .filter(Leaderboard.total_score > player_score)
-            .scalar()
+def _apply_sessions(
+    db: Session, user_id: int, sessions: List[PendingSession]
+) -> List[Optional[AppliedSession]]:
+    """
+    Record several sessions of one player with a single leaderboard write.
+    Returns one entry per session, as for _apply_session: total_sessions
+    counts up to that session, while total_score and the rank key are the
+    player's after the whole batch.
+    """
+    recorded = []
+    for session in sessions:
+        inserted = db.execute(
+            text(
+                """
+                INSERT INTO game_sessions (user_id, score, game_mode, timestamp, request_id)
+                VALUES (:user_id, :score, :game_mode, :timestamp, :request_id)
+                ON CONFLICT(user_id, request_id) DO NOTHING
+                """
+            ),
+            {
+                "user_id": user_id,
+                "score": session.score,
+                "game_mode": session.game_mode,
+                "timestamp": session.timestamp,
+                "request_id": session.request_id,
+            },
+        )
+        recorded.append(inserted.rowcount > 0)
+    applied = [session for session, was_recorded in zip(sessions, recorded) if was_recorded]
+    if not applied:
+        return [None] * len(sessions)
+
+    # Fold the sessions into the player's scoring-rule state; the row lock
+    # serialises concurrent submits for the same player
+    entry = (
+        db.query(
+            Leaderboard.total_score,
+            Leaderboard.total_sessions,
+            Leaderboard.rule_state,
+            Leaderboard.scoring_rule,
+            Leaderboard.tie_break,
         )
+        .filter(Leaderboard.user_id == user_id)
+        .with_for_update()
+        .first()
+    )
+    if entry is not None and entry.scoring_rule == active_rule.name:
+        state = json.loads(entry.rule_state)
+        for session in applied:
+            state = active_rule.update(state, session.score, session.timestamp)
+        total_sessions = entry.total_sessions + len(applied)
+        total_score = active_rule.value(state)
+        rule_state = json.dumps(state)
+    else:
+        # New player, or one not yet converted to the active rule: build the
+        # state from their history (which already includes these sessions)
+        _, total_sessions, total_score, rule_state = next(
+            aggregate_users(db, active_rule, user_id, user_id)
+        )
+
+    # The tie-break records when the current total_score was first reached
+    now = datetime.utcnow()
+    if entry is not None and entry.total_score == total_score:
+        tie_break = entry.tie_break
+    else:
+        tie_break = tie_break_for(user_id, now)
+
+    db.execute(
+        text(
+            """
+    INSERT INTO leaderboard
+        (user_id, total_score, total_sessions, rule_state, scoring_rule, tie_break, changed_at)
+    VALUES (:user_id, :total_score, :total_sessions, :rule_state, :scoring_rule, :tie_break, :changed_at)
+    ON CONFLICT(user_id) DO UPDATE SET
+        total_score = excluded.total_score,
+        total_sessions = excluded.total_sessions,
+        rule_state = excluded.rule_state,
+        scoring_rule = excluded.scoring_rule,
+        tie_break = excluded.tie_break,
+        changed_at = excluded.changed_at
+    """
+        ),
+        {
+            "user_id": user_id,
+            "total_score": total_score,
+            "total_sessions": total_sessions,
+            "rule_state": rule_state,
+            "scoring_rule": active_rule.name,
+            "tie_break": tie_break,
+            "changed_at": now,
+        },
+    )
+    append_events(db, [{"user_id": user_id, "kind": "score", "total_score": total_score}])
+
+    key = (total_score, tie_break)
+    results = []
+    session_count = total_sessions - len(applied)
+    for was_recorded in recorded:
+        if was_recorded:
+            session_count += 1
+            results.append(AppliedSession(session_count, total_score, key))
+        else:
+            results.append(None)
+    return results
+
+
+async def _apply_submissions(
+    db: Session, user_id: int, sessions: List[PendingSession]
+) -> List[Optional[AppliedSession]]:
+    """Commit a batch of one player's submissions and publish the outcome once."""
+    applied = await run_db(_commit_sessions, db, user_id, sessions)
+
+    recorded = [entry for entry in applied if entry is not None]
+    if recorded:
+        _publish_update(db, user_id, recorded[-1])
+    return applied
+
+
+def _commit_sessions(
+    db: Session, user_id: int, sessions: List[PendingSession]
+) -> List[Optional[AppliedSession]]:
+    with db.begin_nested():
+        applied = _apply_sessions(db, user_id, sessions)
+    db.commit()
+    return applied
+
+
+submission_coalescer = SubmissionCoalescer(_apply_submissions)
+
 
-        db.query(Leaderboard).filter(Leaderboard.user_id == user_id).update(
-            {"rank": higher_scores + 1}
+def _publish_update(db: Session, user_id: int, applied: AppliedSession):
+    """
+    Hand a committed score change to streaming subscribers, loaded group
+    boards and the rank maintainer, which publishes the player's new rank
+    once it is known.
+    """
+    leaderboard_hub.publish_score(db, user_id, *applied.key)
+    group_boards.publish_score(user_id, applied.key)
+    rank_maintainer.schedule()
+
+
+def _user_exists(db: Session, user_id: int) -> bool:
+    return db.query(User.id).filter(User.id == user_id).first() is not None
+
+
+def _quarantine_submission(
+    db: Session, submission: ScoreSubmission, game_mode: str, z_score: float
+) -> ScoreResponse:
+    """
+    Park a flagged submission without touching game_sessions or the leaderboard.
+    """
+    db.add(
+        QuarantinedSession(
+            user_id=submission.user_id,
+            score=submission.score,
+            game_mode=game_mode,
+            timestamp=datetime.utcnow(),
+            z_score=z_score,
+            request_id=submission.request_id,
         )
+    )
+    try:
+        db.commit()
+    except IntegrityError:
+        # Retry of a submission that is already quarantined
+        db.rollback()
+
+    total_sessions = (
+        db.query(Leaderboard.total_sessions)
+        .filter(Leaderboard.user_id == submission.user_id)
+        .scalar()
+    ) or 0
+
+    response = ScoreResponse(
+        message="Score flagged for review",
+        user_id=submission.user_id,
+        score=submission.score,
+        total_sessions=total_sessions,
+        status="flagged",
+    )
+    if submission.request_id:
+        submission_cache.put((submission.user_id, submission.request_id), response)
+    return response
+
+
+def _original_response(db: Session, user_id: int, request_id: str) -> ScoreResponse:
+    """
+    Rebuild the response of an already recorded submission from its game session.
+    Only used on the (rare) retry path that missed the in-memory cache.
+    """
+    original = db.execute(
+        text(
+            """
+            SELECT g.user_id, g.score, (
+                SELECT COUNT(*)
+                FROM game_sessions AS g2
+                WHERE g2.user_id = g.user_id AND g2.id <= g.id
+            ) AS total_sessions
+            FROM game_sessions AS g
+            WHERE g.user_id = :user_id AND g.request_id = :request_id
+            """
+        ),
+        {"user_id": user_id, "request_id": request_id},
+    ).first()
 
+    response = ScoreResponse(
+        message="Score submitted successfully",
+        user_id=original.user_id,
+        score=original.score,
+        total_sessions=original.total_sessions,
+    )
+    submission_cache.put((user_id, request_id), response)
+    return response
+
+
+async def _update_leaderboard_ranks(db: Session):
+    """
+    Helper function to update ranks for all players in the leaderboard.
+    """
+    try:
+        recompute_ranks(db, changed_at=datetime.utcnow())
         db.commit()
 
     except Exception as e:
         db.rollback()
         raise e
-    
-
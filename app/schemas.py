@@ -1,17 +1,20 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import datetime
 
 class ScoreSubmission(BaseModel):
     user_id: int
     score: int
     game_mode: Optional[str] = "solo"
+    # Optional idempotency key; a retry with the same key returns the original response
+    request_id: Optional[str] = Field(default=None, max_length=64)
 
 class ScoreResponse(BaseModel):
     message: str
     user_id: int
     score: int
     total_sessions: int
+    status: str = "accepted"
 
 class LeaderboardEntry(BaseModel):
     user_id: int
@@ -25,6 +28,49 @@ class PlayerRank(BaseModel):
     rank: int
     total_score: float
     total_sessions: int
+    # Only set in league mode, once the player has been placed
+    tier: Optional[int] = None
+    division: Optional[int] = None
+    division_rank: Optional[int] = None
+
+class QuarantinedSessionEntry(BaseModel):
+    id: int
+    user_id: int
+    score: int
+    game_mode: str
+    timestamp: datetime
+    z_score: float
+
+class RankHistoryPoint(BaseModel):
+    timestamp: datetime
+    rank: int
+    total_score: float
+
+class GroupCreate(BaseModel):
+    name: str = Field(max_length=255)
+    user_ids: List[int] = []
+
+class GroupMembers(BaseModel):
+    user_ids: List[int]
+
+class GroupResponse(BaseModel):
+    id: int
+    name: str
+    member_count: int
+
+class ChangeEvent(BaseModel):
+    seq: int
+    # None for "reset"
+    user_id: Optional[int] = None
+    kind: str
+    total_score: Optional[float] = None
+    rank: Optional[int] = None
+    created_at: datetime
+
+class ChangesResponse(BaseModel):
+    events: List[ChangeEvent]
+    # Pass as `since` on the next call
+    next_seq: int
 
 class ErrorResponse(BaseModel):
     error: str
@@ -0,0 +1,121 @@
+import enum
+import math
+import os
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+FLAG_Z_SCORE = float(os.getenv("ANTI_CHEAT_FLAG_Z", "4.0"))
+REJECT_Z_SCORE = float(os.getenv("ANTI_CHEAT_REJECT_Z", "8.0"))
+MIN_SAMPLES = int(os.getenv("ANTI_CHEAT_MIN_SAMPLES", "5"))
+# Smallest spread used for z-scores, as a fraction of the mean
+MIN_SPREAD = float(os.getenv("ANTI_CHEAT_MIN_SPREAD", "0.25"))
+MAX_TRACKED_USERS = int(os.getenv("ANTI_CHEAT_MAX_TRACKED_USERS", "100000"))
+
+
+class Verdict(enum.Enum):
+    ACCEPT = "accept"
+    FLAG = "flag"
+    REJECT = "reject"
+
+
+class RollingStats:
+    """
+    Running mean/variance using Welford's algorithm.
+    Each update is O(1) and keeps three numbers per tracked key.
+    """
+
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def push(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def stddev(self) -> float:
+        if self.count < 2:
+            return 0.0
+        return math.sqrt(self.m2 / (self.count - 1))
+
+    def z_score(self, value: float, min_spread: float = MIN_SPREAD) -> float:
+        # Floor the spread so a consistent player isn't flagged for an
+        # ordinary improvement.
+        spread = max(self.stddev, abs(self.mean) * min_spread, 1.0)
+        return (value - self.mean) / spread
+
+
+class ScoreValidator:
+    """
+    In-memory outlier check for score submissions.
+
+    Players with enough history are judged against their own rolling stats;
+    new players are judged against the distribution of their game mode.
+    Only upward outliers are considered suspicious. A score is only rejected
+    if it is also extreme for the game mode; an outlier for the player alone
+    is flagged, so a player who improves lands in quarantine, not a 422.
+    """
+
+    def __init__(
+        self,
+        flag_z: float = FLAG_Z_SCORE,
+        reject_z: float = REJECT_Z_SCORE,
+        min_samples: int = MIN_SAMPLES,
+        max_users: int = MAX_TRACKED_USERS,
+    ):
+        self.flag_z = flag_z
+        self.reject_z = reject_z
+        self.min_samples = min_samples
+        self.max_users = max_users
+        self._users: "OrderedDict[int, RollingStats]" = OrderedDict()
+        self._modes = {}
+
+    def evaluate(self, user_id: int, game_mode: str, score: int) -> Tuple[Verdict, float]:
+        stats = self._baseline(user_id, game_mode)
+        if stats is None:
+            return Verdict.ACCEPT, 0.0
+
+        z = stats.z_score(score)
+        if z >= self.reject_z and self._mode_z(game_mode, score) >= self.reject_z:
+            return Verdict.REJECT, z
+        if z >= self.flag_z:
+            return Verdict.FLAG, z
+        return Verdict.ACCEPT, z
+
+    def record(self, user_id: int, game_mode: str, score: int):
+        """Feed an accepted score into the rolling stats."""
+        user_stats = self._users.get(user_id)
+        if user_stats is None:
+            user_stats = self._users[user_id] = RollingStats()
+            if len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(user_id)
+        user_stats.push(score)
+
+        self._modes.setdefault(game_mode, RollingStats()).push(score)
+
+    def _baseline(self, user_id: int, game_mode: str) -> Optional[RollingStats]:
+        user_stats = self._users.get(user_id)
+        if user_stats is not None and user_stats.count >= self.min_samples:
+            return user_stats
+
+        mode_stats = self._modes.get(game_mode)
+        if mode_stats is not None and mode_stats.count >= self.min_samples:
+            return mode_stats
+
+        return None
+
+    def _mode_z(self, game_mode: str, score: int) -> float:
+        mode_stats = self._modes.get(game_mode)
+        if mode_stats is None or mode_stats.count < self.min_samples:
+            return math.inf
+        return mode_stats.z_score(score)
+
+
+score_validator = ScoreValidator()
@@ -0,0 +1,182 @@
+import asyncio
+import bisect
+import os
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import desc
+from sqlalchemy.orm import Session
+
+from app.models import Leaderboard
+from app.services.ranking import ranks_in_order
+
+STREAM_TOP_SIZE = int(os.getenv("STREAM_TOP_SIZE", "10"))
+
+ENTERED = "entered"
+LEFT = "left"
+MOVED = "moved"
+
+
+class Subscriber:
+    """
+    One streaming client.
+
+    Updates are merged into a pending batch instead of being queued, so a slow
+    client costs at most one entry per top-N player plus its own rank, and
+    simply receives fewer, coarser diffs.
+    """
+
+    def __init__(self, user_id: Optional[int] = None):
+        self.user_id = user_id
+        self._pending_top: Dict[int, dict] = {}
+        self._pending_rank: Optional[dict] = None
+        self._ready = asyncio.Event()
+
+    def offer_top(self, changes: List[dict]):
+        for change in changes:
+            self._merge(change)
+        if self._pending_top:
+            self._ready.set()
+
+    def offer_rank(self, change: dict):
+        self._pending_rank = change
+        self._ready.set()
+
+    async def next_batch(self) -> dict:
+        await self._ready.wait()
+        self._ready.clear()
+        batch = {}
+        if self._pending_top:
+            batch["top"] = list(self._pending_top.values())
+            self._pending_top = {}
+        if self._pending_rank is not None:
+            batch["rank"] = self._pending_rank
+            self._pending_rank = None
+        return batch
+
+    def _merge(self, change: dict):
+        user_id = change["user_id"]
+        previous = self._pending_top.get(user_id)
+        if previous is None:
+            self._pending_top[user_id] = change
+            return
+
+        before, after = previous["change"], change["change"]
+        if before == ENTERED and after == LEFT:
+            # The client never saw this player on the board
+            del self._pending_top[user_id]
+        elif before == ENTERED:
+            self._pending_top[user_id] = {**change, "change": ENTERED}
+        elif before == LEFT and after != LEFT:
+            self._pending_top[user_id] = {**change, "change": MOVED}
+        else:
+            self._pending_top[user_id] = change
+
+
+class LeaderboardHub:
+    """
+    Fans leaderboard changes out to streaming subscribers.
+
+    The hub keeps its own copy of the top-N while anyone is subscribed, so each
+    submission is diffed against it once, in memory, and the same diff is
+    handed to every subscriber. With no subscribers, publishing is a no-op.
+    The copy is in board order, as (-total_score, -tie_break, -user_id), and
+    ranked in the configured rank mode, so it agrees with /top.
+    """
+
+    def __init__(self, size: int = STREAM_TOP_SIZE):
+        self.size = size
+        self._top: Optional[List[Tuple[float, float, int]]] = None
+        self._subscribers: Set[Subscriber] = set()
+
+    def subscribe(self, db: Session, user_id: Optional[int] = None) -> Subscriber:
+        if self._top is None:
+            self._load(db)
+        subscriber = Subscriber(user_id)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._subscribers.discard(subscriber)
+        if not self._subscribers:
+            # Nobody is watching; reload on the next subscription instead of
+            # keeping the snapshot in sync
+            self._top = None
+
+    def snapshot(self) -> List[dict]:
+        return [
+            {"user_id": user_id, "rank": rank, "total_score": score}
+            for user_id, (rank, score) in self._positions().items()
+        ]
+
+    def watched_users(self) -> Set[int]:
+        return {s.user_id for s in self._subscribers if s.user_id is not None}
+
+    def publish_score(self, db: Session, user_id: int, total_score: float, tie_break: float):
+        """Apply a player's new total_score to the top-N and fan out the diff."""
+        if not self._subscribers or self._top is None:
+            return
+
+        before = self._positions()
+        top = [entry for entry in self._top if entry[2] != -user_id]
+        was_member = len(top) < len(self._top)
+        bisect.insort(top, (-total_score, -tie_break, -user_id))
+        del top[self.size:]
+
+        if was_member and len(top) == self.size and top[-1][2] == -user_id:
+            # A board member fell to the last slot; someone else may belong there
+            self._load(db)
+        else:
+            self._top = top
+
+        changes = self._diff(before, self._positions())
+        if changes:
+            for subscriber in self._subscribers:
+                subscriber.offer_top(changes)
+
+    def publish_rank(self, user_id: int, rank: int, total_score: float):
+        change = {"user_id": user_id, "rank": rank, "total_score": total_score}
+        for subscriber in self._subscribers:
+            if subscriber.user_id == user_id:
+                subscriber.offer_rank(change)
+
+    def _load(self, db: Session):
+        rows = (
+            db.query(Leaderboard.user_id, Leaderboard.total_score, Leaderboard.tie_break)
+            .order_by(
+                desc(Leaderboard.total_score),
+                desc(Leaderboard.tie_break),
+                desc(Leaderboard.user_id),
+            )
+            .limit(self.size)
+            .all()
+        )
+        self._top = [(-row.total_score, -row.tie_break, -row.user_id) for row in rows]
+
+    def _positions(self) -> Dict[int, Tuple[int, float]]:
+        """user_id -> (rank, total_score) of the top-N, in board order."""
+        top = self._top or []
+        ranks = ranks_in_order(-neg_score for neg_score, _, _ in top)
+        return {
+            -neg_user_id: (rank, -neg_score)
+            for (neg_score, _, neg_user_id), rank in zip(top, ranks)
+        }
+
+    @staticmethod
+    def _diff(before: dict, after: dict) -> List[dict]:
+        changes = []
+        for user_id, (rank, score) in after.items():
+            if user_id not in before:
+                kind = ENTERED
+            elif before[user_id] != (rank, score):
+                kind = MOVED
+            else:
+                continue
+            changes.append(
+                {"user_id": user_id, "change": kind, "rank": rank, "total_score": score}
+            )
+        for user_id in before.keys() - after.keys():
+            changes.append({"user_id": user_id, "change": LEFT})
+        return changes
+
+
+leaderboard_hub = LeaderboardHub()
@@ -0,0 +1,79 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+# A player whose previous submission came less than this long ago is "hot":
+# their next submissions are held for this long and written together
+SUBMIT_COALESCE_WINDOW = float(os.getenv("SUBMIT_COALESCE_WINDOW_SECONDS", "0.01"))
+
+# apply_batch(db, user_id, items) -> one result per item, in order
+BatchApplier = Callable[[Session, int, List[Any]], Awaitable[List[Any]]]
+
+
+class SubmissionCoalescer:
+    """
+    Merges concurrent submissions for the same player into one write.
+
+    A player's submission is applied straight away unless they are hot.
+    The first submission of a hot player opens a batch and waits `window`
+    seconds. Every submission arriving meanwhile joins it, and the batch is
+    then applied by that first caller in a single transaction. So a hot
+    player costs one leaderboard row lock and one rank update per window
+    instead of one per submission. Players who submit rarely add no latency.
+    """
+
+    def __init__(self, apply_batch: BatchApplier, window: float = SUBMIT_COALESCE_WINDOW):
+        self.apply_batch = apply_batch
+        self.window = window
+        # user_id -> (item, future) of the callers waiting on the open batch
+        self._open: dict = {}
+        # user_id -> monotonic time of their last submission, oldest first
+        self._last_seen: "OrderedDict[int, float]" = OrderedDict()
+
+    async def submit(self, db: Session, user_id: int, item: Any) -> Any:
+        """Apply `item` for `user_id`, possibly with others; returns its own result."""
+        waiting = self._open.get(user_id)
+        if waiting is not None:
+            future = asyncio.get_running_loop().create_future()
+            waiting.append((item, future))
+            return await future
+
+        if not self._is_hot(user_id):
+            return (await self.apply_batch(db, user_id, [item]))[0]
+
+        waiting: List[Tuple[Any, Optional[asyncio.Future]]] = [(item, None)]
+        self._open[user_id] = waiting
+        try:
+            await asyncio.sleep(self.window)
+            # Later submissions start the next batch
+            del self._open[user_id]
+            results = await self.apply_batch(db, user_id, [entry for entry, _ in waiting])
+        except BaseException as e:
+            if self._open.get(user_id) is waiting:
+                del self._open[user_id]
+            error = e if isinstance(e, Exception) else asyncio.CancelledError()
+            for _, future in waiting[1:]:
+                if not future.done():
+                    future.set_exception(error)
+            raise
+
+        for (_, future), result in zip(waiting[1:], results[1:]):
+            if not future.done():
+                future.set_result(result)
+        return results[0]
+
+    def _is_hot(self, user_id: int) -> bool:
+        now = time.monotonic()
+        last = self._last_seen.pop(user_id, None)
+        self._last_seen[user_id] = now
+        # Entries older than the window can no longer make anyone hot
+        while self._last_seen:
+            oldest_user, seen_at = next(iter(self._last_seen.items()))
+            if now - seen_at < self.window:
+                break
+            del self._last_seen[oldest_user]
+        return self.window > 0 and last is not None and now - last < self.window
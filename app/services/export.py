@@ -0,0 +1,73 @@
+import csv
+import io
+import json
+import os
+from typing import Iterator
+
+from sqlalchemy import text
+
+from app.core.database import engine
+from app.services.leagues import LEAGUE_MODE
+from app.services.ranking import ORDER_BY, rank_window
+
+# Rows fetched from the server-side cursor, and written, per chunk
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+
+EXPORT_COLUMNS = ("rank", "user_id", "username", "total_score", "total_sessions")
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def iter_leaderboard(batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[list]:
+    """
+    The whole board in rank order, `batch_size` rows at a time.
+
+    Reads through a server-side cursor on a connection of its own, so memory
+    stays at one batch whatever the board size. The connection is returned
+    to the pool as soon as the export ends or the client goes away. In
+    league mode stored global ranks wait for update-leagues, so the rank is
+    computed while reading instead.
+    """
+    rank = rank_window() if LEAGUE_MODE else "leaderboard.rank"
+    with engine.connect() as connection:
+        result = connection.execution_options(
+            stream_results=True, yield_per=batch_size
+        ).execute(
+            text(
+                f"""
+                SELECT {rank} AS rank, leaderboard.user_id, users.username,
+                       leaderboard.total_score, leaderboard.total_sessions
+                FROM leaderboard JOIN users ON users.id = leaderboard.user_id
+                ORDER BY {ORDER_BY}
+                """
+            )
+        )
+        for batch in result.partitions():
+            yield batch
+
+
+def export_chunks(export_format: str, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    """The board encoded as NDJSON or CSV, one chunk of text per batch."""
+    if export_format not in MEDIA_TYPES:
+        raise ValueError(f"Unknown export format {export_format!r}")
+
+    if export_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        for batch in iter_leaderboard(batch_size):
+            writer.writerows(batch)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+        return
+
+    for batch in iter_leaderboard(batch_size):
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n" for row in batch
+        )
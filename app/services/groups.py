@@ -0,0 +1,167 @@
+import bisect
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.services.ranking import RANK_MODE, RankKey, ranks_in_order, tie_break_for
+
+MAX_CACHED_GROUPS = int(os.getenv("GROUP_BOARD_CACHE_SIZE", "10000"))
+# Boards are kept in sync with submits handled by this process; the TTL
+# bounds how long changes made through other workers can go unnoticed
+GROUP_BOARD_TTL = float(os.getenv("GROUP_BOARD_TTL_SECONDS", "30"))
+
+
+class GroupBoard:
+    """
+    One group's members in board order, as (-total_score, -tie_break,
+    -user_id) entries, ranked in the configured rank mode like /top.
+    Rendered top-N responses are cached on the board and dropped as soon as
+    a change reaches the part of the board they cover.
+    """
+
+    def __init__(self, keys: Dict[int, RankKey]):
+        self.keys = keys
+        self.entries: List[Tuple[float, float, int]] = sorted(
+            _entry(user_id, key) for user_id, key in keys.items()
+        )
+        self.loaded_at = time.monotonic()
+        self._top_cache: Dict[int, list] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def set_score(self, user_id: int, key: RankKey):
+        old_key = self.keys.get(user_id)
+        if old_key == key:
+            return
+        positions = []
+        if old_key is not None:
+            position = bisect.bisect_left(self.entries, _entry(user_id, old_key))
+            del self.entries[position]
+            positions.append(position)
+        self.keys[user_id] = key
+        position = bisect.bisect_left(self.entries, _entry(user_id, key))
+        self.entries.insert(position, _entry(user_id, key))
+        positions.append(position)
+        self._invalidate(min(positions))
+
+    def top(self, limit: int) -> List[Tuple[int, float, int]]:
+        """(user_id, total_score, rank) of the first `limit` members."""
+        top = self.entries[:limit]
+        ranks = ranks_in_order(-neg_score for neg_score, _, _ in top)
+        return [
+            (-neg_user_id, -neg_score, rank)
+            for (neg_score, _, neg_user_id), rank in zip(top, ranks)
+        ]
+
+    def rank(self, user_id: int) -> Optional[Tuple[int, float]]:
+        key = self.keys.get(user_id)
+        if key is None:
+            return None
+        if RANK_MODE == "ordinal":
+            return bisect.bisect_left(self.entries, _entry(user_id, key)) + 1, key[0]
+        # Members with a strictly higher score come first
+        higher = bisect.bisect_left(self.entries, (-key[0], -math.inf, -math.inf))
+        if RANK_MODE == "dense":
+            # Counting distinct scores costs O(position); groups are small
+            return len({neg_score for neg_score, _, _ in self.entries[:higher]}) + 1, key[0]
+        return higher + 1, key[0]
+
+    def cached_top(self, limit: int) -> Optional[list]:
+        return self._top_cache.get(limit)
+
+    def cache_top(self, limit: int, response: list):
+        self._top_cache[limit] = response
+
+    def _invalidate(self, position: int):
+        # Entries before `position` kept their place and rank
+        self._top_cache = {
+            limit: response for limit, response in self._top_cache.items() if position >= limit
+        }
+
+
+def _entry(user_id: int, key: RankKey) -> Tuple[float, float, int]:
+    return (-key[0], -key[1], -user_id)
+
+
+class GroupBoards:
+    """
+    LRU of loaded group boards. Score changes are pushed into every loaded
+    board the player belongs to, so reads never go back to the database
+    until a board expires or is evicted.
+    """
+
+    def __init__(self, max_groups: int = MAX_CACHED_GROUPS, ttl: float = GROUP_BOARD_TTL):
+        self.max_groups = max_groups
+        self.ttl = ttl
+        self._boards: "OrderedDict[int, GroupBoard]" = OrderedDict()
+        # user_id -> ids of loaded boards they are on
+        self._member_of: Dict[int, Set[int]] = {}
+
+    def get(self, db: Session, group_id: int) -> GroupBoard:
+        board = self._boards.get(group_id)
+        if board is not None and time.monotonic() - board.loaded_at < self.ttl:
+            self._boards.move_to_end(group_id)
+            return board
+
+        keys = {
+            row.user_id: (
+                row.total_score or 0.0,
+                tie_break_for(row.user_id, None) if row.tie_break is None else row.tie_break,
+            )
+            for row in db.execute(
+                text(
+                    """
+                    SELECT m.user_id, l.total_score, l.tie_break
+                    FROM group_members AS m
+                    LEFT JOIN leaderboard AS l ON l.user_id = m.user_id
+                    WHERE m.group_id = :group_id
+                    """
+                ),
+                {"group_id": group_id},
+            )
+        }
+        self.discard(group_id)
+        board = GroupBoard(keys)
+        if not keys and not _group_exists(db, group_id):
+            # Not cached: the group may be created in the meantime
+            return board
+        self._boards[group_id] = board
+        for user_id in keys:
+            self._member_of.setdefault(user_id, set()).add(group_id)
+        if len(self._boards) > self.max_groups:
+            self.discard(next(iter(self._boards)))
+        return board
+
+    def publish_score(self, user_id: int, key: RankKey):
+        """Move a player on every loaded board they are on; `key` is (total_score, tie_break)."""
+        for group_id in self._member_of.get(user_id, ()):
+            self._boards[group_id].set_score(user_id, key)
+
+    def discard(self, group_id: int):
+        """Forget a board, e.g. after its membership changed; the next read reloads it."""
+        board = self._boards.pop(group_id, None)
+        if board is not None:
+            for user_id in board.keys:
+                self._forget(user_id, group_id)
+
+    def _forget(self, user_id: int, group_id: int):
+        groups = self._member_of.get(user_id)
+        if groups is not None:
+            groups.discard(group_id)
+            if not groups:
+                del self._member_of[user_id]
+
+
+def _group_exists(db: Session, group_id: int) -> bool:
+    return db.execute(
+        text("SELECT 1 FROM player_groups WHERE id = :group_id"), {"group_id": group_id}
+    ).first() is not None
+
+
+group_boards = GroupBoards()
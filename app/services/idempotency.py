@@ -0,0 +1,36 @@
+import os
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, TypeVar
+
+CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "100000"))
+
+T = TypeVar("T")
+
+
+class IdempotencyCache(Generic[T]):
+    """
+    Bounded LRU of recently completed requests keyed by (user_id, request_id).
+
+    A hit lets a retried request be answered without touching the database.
+    A miss is not proof the key is new; the unique index on
+    game_sessions (user_id, request_id) remains the source of truth.
+    """
+
+    def __init__(self, max_entries: int = CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, T]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[T]:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: T):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+submission_cache: IdempotencyCache = IdempotencyCache()
@@ -0,0 +1,259 @@
+import os
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.services.meta import get_meta, set_meta
+from app.services.outbox import lock_outbox
+from app.services.ranking import RankKey, count_rank, rank_window, recompute_ranks
+
+LEAGUE_MODE = os.getenv("LEAGUE_MODE", "false").lower() in ("1", "true", "yes")
+DIVISION_SIZE = int(os.getenv("LEAGUE_DIVISION_SIZE", "100"))
+# Minimum total_score of each tier, best tier (tier 1) first; the last tier
+# takes everyone below the previous threshold
+TIER_THRESHOLDS = [
+    float(threshold) for threshold in os.getenv("LEAGUE_TIERS", "7500,5000,2500,0").split(",")
+]
+
+# LEAGUE_MODE the stored global ranks were last maintained under
+META_KEY = "league_mode"
+LEAGUE_SETTING = "true" if LEAGUE_MODE else "false"
+
+
+def tier_for(total_score: float) -> int:
+    for tier, threshold in enumerate(TIER_THRESHOLDS, start=1):
+        if total_score >= threshold:
+            return tier
+    return len(TIER_THRESHOLDS)
+
+
+def _tier_case() -> Tuple[str, Dict[str, float]]:
+    """SQL expression computing tier_for(total_score), with its parameters."""
+    whens = " ".join(
+        f"WHEN total_score >= :tier_{tier} THEN {tier}"
+        for tier in range(1, len(TIER_THRESHOLDS))
+    )
+    params = {f"tier_{tier}": threshold for tier, threshold in enumerate(TIER_THRESHOLDS, start=1)}
+    return f"CASE {whens} ELSE {len(TIER_THRESHOLDS)} END", params
+
+
+def apply_division_moves(
+    db: Session, moves: Dict[int, Tuple[Optional[RankKey], RankKey]]
+) -> Dict[int, int]:
+    """
+    League-mode counterpart of apply_rank_moves: place players that have no
+    division yet, then re-rank only the divisions the movers are in. Players
+    stay in their division when their score leaves the tier's range until
+    the next promotion/relegation run. The global rank is left to that run,
+    except that players who have none yet get one by counting.
+    Returns each mover's division rank. The caller commits.
+    """
+    rows = db.execute(
+        text(
+            """
+            SELECT user_id, tier, division, total_score, tie_break, rank
+            FROM leaderboard WHERE user_id IN :users
+            """
+        ).bindparams(bindparam("users", expanding=True)),
+        {"users": list(moves)},
+    ).all()
+
+    unranked = [
+        {"user_id": row.user_id, "rank": count_rank(db, row.user_id, (row.total_score, row.tie_break))}
+        for row in rows
+        if row.rank is None
+    ]
+    if unranked:
+        db.execute(text("UPDATE leaderboard SET rank = :rank WHERE user_id = :user_id"), unranked)
+
+    unplaced = defaultdict(list)
+    divisions: Set[Tuple[int, int]] = set()
+    for row in rows:
+        if row.division is None:
+            unplaced[tier_for(row.total_score)].append(row.user_id)
+        else:
+            divisions.add((row.tier, row.division))
+    for tier, user_ids in unplaced.items():
+        divisions.update(place_players(db, tier, user_ids))
+
+    for tier, division in divisions:
+        refresh_division_ranks(db, tier, division)
+
+    return dict(
+        db.execute(
+            text("SELECT user_id, division_rank FROM leaderboard WHERE user_id IN :users")
+            .bindparams(bindparam("users", expanding=True)),
+            {"users": list(moves)},
+        ).all()
+    )
+
+
+def place_players(db: Session, tier: int, user_ids: List[int]) -> Set[Tuple[int, int]]:
+    """
+    Put players into divisions of `tier` with free seats, opening new
+    divisions when the existing ones are full. Returns the divisions used.
+    """
+    last_division = db.execute(
+        text("SELECT MAX(division) FROM leaderboard WHERE tier = :tier"), {"tier": tier}
+    ).scalar() or 0
+
+    if len(user_ids) == 1:
+        # A newcomer on the submit path only looks at the newest division:
+        # one index seek plus a count of at most DIVISION_SIZE rows
+        members = db.execute(
+            text("SELECT COUNT(*) FROM leaderboard WHERE tier = :tier AND division = :division"),
+            {"tier": tier, "division": last_division},
+        ).scalar()
+        open_seats = (
+            [(last_division, DIVISION_SIZE - members)]
+            if last_division and members < DIVISION_SIZE
+            else []
+        )
+    else:
+        open_seats = [
+            (division, DIVISION_SIZE - members)
+            for division, members in db.execute(
+                text(
+                    """
+                    SELECT division, COUNT(*) FROM leaderboard
+                    WHERE tier = :tier AND division IS NOT NULL
+                    GROUP BY division
+                    HAVING COUNT(*) < :size
+                    ORDER BY division
+                    """
+                ),
+                {"tier": tier, "size": DIVISION_SIZE},
+            )
+        ]
+
+    assignments = []
+    used = set()
+    pending = iter(user_ids)
+    for division, seats in _seats(open_seats, last_division + 1):
+        batch = [user_id for _, user_id in zip(range(seats), pending)]
+        if not batch:
+            break
+        assignments.extend(
+            {"tier": tier, "division": division, "user_id": user_id} for user_id in batch
+        )
+        used.add((tier, division))
+
+    db.execute(
+        text(
+            """
+            UPDATE leaderboard SET tier = :tier, division = :division, division_rank = NULL
+            WHERE user_id = :user_id
+            """
+        ),
+        assignments,
+    )
+    return used
+
+
+def _seats(open_seats: List[Tuple[int, int]], next_division: int) -> Iterable[Tuple[int, int]]:
+    yield from open_seats
+    while True:
+        yield next_division, DIVISION_SIZE
+        next_division += 1
+
+
+def refresh_division_ranks(db: Session, tier: int, division: int):
+    """Re-rank one division; touches at most DIVISION_SIZE rows."""
+    db.execute(
+        text(
+            f"""
+            UPDATE leaderboard
+            SET division_rank = ranked.new_rank
+            FROM (
+                SELECT user_id, {rank_window()} AS new_rank
+                FROM leaderboard
+                WHERE tier = :tier AND division = :division
+            ) AS ranked
+            WHERE leaderboard.user_id = ranked.user_id
+              AND (leaderboard.division_rank IS NULL OR leaderboard.division_rank != ranked.new_rank)
+            """
+        ),
+        {"tier": tier, "division": division},
+    )
+
+
+def run_promotions(db: Session) -> int:
+    """
+    Periodic promotion/relegation. Players whose score now belongs to another
+    tier are moved there in bulk and seated in divisions with free places
+    (or new ones); everyone else keeps their division. Division ranks and the
+    global rank are then recomputed. Returns the number of players placed.
+    Commits.
+    """
+    lock_outbox(db)
+    tier_case, params = _tier_case()
+    placed = db.execute(
+        text(
+            f"""
+            UPDATE leaderboard
+            SET tier = {tier_case}, division = NULL, division_rank = NULL
+            WHERE division IS NULL OR tier IS NULL OR tier != {tier_case}
+            """
+        ),
+        params,
+    ).rowcount
+
+    unplaced = defaultdict(list)
+    for user_id, tier in db.execute(
+        text("SELECT user_id, tier FROM leaderboard WHERE division IS NULL ORDER BY total_score DESC")
+    ):
+        unplaced[tier].append(user_id)
+    for tier, user_ids in unplaced.items():
+        place_players(db, tier, user_ids)
+
+    db.execute(
+        text(
+            f"""
+            UPDATE leaderboard
+            SET division_rank = ranked.new_rank
+            FROM (
+                SELECT user_id, {rank_window("tier, division")} AS new_rank
+                FROM leaderboard
+            ) AS ranked
+            WHERE leaderboard.user_id = ranked.user_id
+              AND (leaderboard.division_rank IS NULL OR leaderboard.division_rank != ranked.new_rank)
+            """
+        )
+    )
+    # Submits only maintain division ranks in league mode
+    recompute_ranks(db, changed_at=datetime.utcnow())
+    db.commit()
+    return placed
+
+
+def league_mode_changed(db: Session) -> bool:
+    # Boards from before leagues existed had their global ranks maintained
+    return (get_meta(db, META_KEY) or "false") != LEAGUE_SETTING
+
+
+def convert_league_mode():
+    """
+    Re-rank the whole board after LEAGUE_MODE changed: while it was on,
+    submits left global ranks to update-leagues, so they are stale when it
+    is turned off. Runs in the background at startup; every worker starts
+    it, and the first to take the outbox lock does the work.
+    """
+    db = SessionLocal()
+    try:
+        lock_outbox(db)
+        if not league_mode_changed(db):
+            # Another worker converted the board
+            db.rollback()
+            return
+        recompute_ranks(db, changed_at=datetime.utcnow())
+        set_meta(db, META_KEY, LEAGUE_SETTING)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,19 @@
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.models import LeaderboardMeta
+
+
+def get_meta(db: Session, key: str) -> Optional[str]:
+    entry = db.get(LeaderboardMeta, key)
+    return entry.value if entry else None
+
+
+def set_meta(db: Session, key: str, value: str):
+    """Store a setting; the caller commits."""
+    entry = db.get(LeaderboardMeta, key)
+    if entry is None:
+        db.add(LeaderboardMeta(key=key, value=value))
+    else:
+        entry.value = value
@@ -0,0 +1,217 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.services.meta import get_meta, set_meta
+
+CHANGES_BATCH_SIZE = int(os.getenv("CHANGES_BATCH_SIZE", "500"))
+# Longest a /changes long-poll waits for new events
+CHANGES_MAX_WAIT = float(os.getenv("CHANGES_MAX_WAIT_SECONDS", "30"))
+# Events committed by other workers are not announced to this one; waiting
+# consumers re-read at least this often
+CHANGES_POLL_INTERVAL = float(os.getenv("CHANGES_POLL_INTERVAL_SECONDS", "1"))
+# How long events are kept by prune_events
+CHANGES_RETENTION = timedelta(days=float(os.getenv("CHANGES_RETENTION_DAYS", "7")))
+PRUNE_BATCH_SIZE = int(os.getenv("CHANGES_PRUNE_BATCH_SIZE", "10000"))
+
+# Lowest seq that has not been pruned
+PRUNED_META_KEY = "events_retained_from"
+
+# Any fixed key; serialises the writers of leaderboard_events (see lock_outbox)
+OUTBOX_LOCK_KEY = 7_300_414
+
+
+def lock_outbox(db: Session):
+    """
+    Hold the outbox lock until the caller's transaction ends. It is taken by
+    the jobs that append to leaderboard_events or write stored ranks, i.e.
+    the rank maintainer and the whole-board jobs, so they run one at a
+    time. Submits never take it: they only queue events (append_events).
+    """
+    if "sqlite" in str(db.bind.url):
+        # Any write takes SQLite's single write lock, even one matching no rows
+        db.execute(text("UPDATE leaderboard_events SET seq = seq WHERE seq < 0"))
+    else:
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": OUTBOX_LOCK_KEY})
+
+
+def _event_rows(events: Iterable[dict]) -> List[dict]:
+    now = datetime.utcnow()
+    return [{"total_score": None, "rank": None, "created_at": now, **event} for event in events]
+
+
+def append_events(db: Session, events: Iterable[dict]):
+    """
+    Queue change events ({"user_id", "kind", "total_score"?, "rank"?}) in
+    the caller's transaction; the caller commits. Writers do not wait for
+    each other: the events reach the log, and /changes, when the rank
+    maintainer next moves them there (take_pending_events).
+    """
+    rows = _event_rows(events)
+    if not rows:
+        return
+    db.execute(
+        text(
+            """
+            INSERT INTO leaderboard_pending_events (user_id, kind, total_score, rank, created_at)
+            VALUES (:user_id, :kind, :total_score, :rank, :created_at)
+            """
+        ),
+        rows,
+    )
+
+
+def take_pending_events(db: Session) -> List[Tuple]:
+    """
+    Remove every committed pending event and return them, oldest first. The
+    caller holds lock_outbox and logs them (log_events) in the same
+    transaction. An event committed meanwhile is left for the next call.
+    """
+    rows = db.execute(
+        text(
+            """
+            DELETE FROM leaderboard_pending_events
+            RETURNING id, user_id, kind, total_score, rank, created_at
+            """
+        )
+    ).all()
+    return sorted(rows, key=lambda row: row.id)
+
+
+def log_events(db: Session, events: Iterable[dict]):
+    """
+    Append events to leaderboard_events in the caller's transaction, which
+    holds lock_outbox. With one appender at a time, seqs become visible in
+    order, so a consumer resuming after the highest seq it saw misses nothing.
+    """
+    rows = _event_rows(events)
+    if not rows:
+        return
+    db.execute(
+        text(
+            """
+            INSERT INTO leaderboard_events (user_id, kind, total_score, rank, created_at)
+            VALUES (:user_id, :kind, :total_score, :rank, :created_at)
+            """
+        ),
+        rows,
+    )
+
+
+def log_reset(db: Session):
+    """
+    Announce that a job rewrote the whole board (rebuild, scoring backfill,
+    league update, re-rank): consumers reload it, e.g. from /export, and
+    carry on after this event. Pending events are logged first, so none
+    that the reload already covers comes after it. The caller holds
+    lock_outbox.
+    """
+    log_events(db, (dict(event._mapping) for event in take_pending_events(db)))
+    log_events(db, [{"user_id": None, "kind": "reset"}])
+
+
+def last_seq(db: Session) -> int:
+    return db.execute(text("SELECT MAX(seq) FROM leaderboard_events")).scalar() or 0
+
+
+def read_events(since: int, limit: int = CHANGES_BATCH_SIZE) -> List[Tuple]:
+    """
+    Events with seq > since, oldest first: a primary-key range read on the
+    outbox alone. Uses a short session of its own, so a waiting consumer
+    does not hold a pooled connection.
+    """
+    db = SessionLocal()
+    try:
+        return db.execute(
+            text(
+                """
+                SELECT seq, user_id, kind, total_score, rank, created_at
+                FROM leaderboard_events
+                WHERE seq > :since
+                ORDER BY seq
+                LIMIT :limit
+                """
+            ),
+            {"since": since, "limit": limit},
+        ).all()
+    finally:
+        db.close()
+
+
+def retained_from() -> int:
+    """The oldest seq still kept; a consumer can resume from since >= this - 1."""
+    db = SessionLocal()
+    try:
+        return int(get_meta(db, PRUNED_META_KEY) or 1)
+    finally:
+        db.close()
+
+
+def prune_events(db: Session, older_than: datetime, batch_size: int = PRUNE_BATCH_SIZE) -> int:
+    """
+    Delete events created before `older_than`. Deletes by primary-key range
+    in batches of `batch_size`, committing each, so writers are never held
+    up for long. Returns the number of events deleted.
+    """
+    keep_from = db.execute(
+        text("SELECT MIN(seq) FROM leaderboard_events WHERE created_at >= :older_than"),
+        {"older_than": older_than},
+    ).scalar()
+    keep_from = keep_from or last_seq(db) + 1
+    oldest = db.execute(text("SELECT MIN(seq) FROM leaderboard_events")).scalar()
+    if oldest is None or oldest >= keep_from:
+        return 0
+
+    # Announce the new horizon first: a consumer behind it gets an error
+    # instead of silently skipping the events being deleted
+    set_meta(db, PRUNED_META_KEY, str(keep_from))
+    db.commit()
+
+    deleted = 0
+    for upto in range(oldest + batch_size, keep_from + batch_size, batch_size):
+        deleted += db.execute(
+            text("DELETE FROM leaderboard_events WHERE seq < :upto"),
+            {"upto": min(upto, keep_from)},
+        ).rowcount
+        db.commit()
+    return deleted
+
+
+class ChangeNotifier:
+    """Wakes long-polling consumers when this process commits new events."""
+
+    def __init__(self):
+        self._event: Optional[asyncio.Event] = None
+
+    def notify(self):
+        if self._event is not None:
+            self._event.set()
+            self._event = None
+
+    async def wait(self, timeout: float):
+        if self._event is None:
+            self._event = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+change_notifier = ChangeNotifier()
+
+
+async def wait_for_events(since: int, limit: int, timeout: float) -> List[Tuple]:
+    """Events after `since`, waiting up to `timeout` seconds for the first one."""
+    deadline = time.monotonic() + min(timeout, CHANGES_MAX_WAIT)
+    while True:
+        events = read_events(since, limit)
+        remaining = deadline - time.monotonic()
+        if events or remaining <= 0:
+            return events
+        await change_notifier.wait(min(remaining, CHANGES_POLL_INTERVAL))
@@ -0,0 +1,164 @@
+import os
+from datetime import date, datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.models import RankHistory
+from app.services.meta import get_meta, set_meta
+
+SNAPSHOT_BATCH_SIZE = int(os.getenv("RANK_SNAPSHOT_BATCH_SIZE", "1000"))
+
+META_KEY = "rank_history_snapshot_at"
+
+# Scores are stored as integer hundredths
+SCORE_SCALE = 100
+
+# (taken at, rank, score in hundredths)
+Sample = Tuple[datetime, int, int]
+
+
+def period_of(moment: datetime) -> date:
+    """History is stored per player per calendar month."""
+    return date(moment.year, moment.month, 1)
+
+
+def _period_start(period: date) -> datetime:
+    return datetime(period.year, period.month, period.day)
+
+
+def _write_varint(out: bytearray, value: int):
+    # Zigzag first so that small negative deltas stay small; unlike the
+    # 64-bit shift form this works for integers of any size
+    value = value << 1 if value >= 0 else (-value << 1) - 1
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varints(data: bytes) -> Iterator[int]:
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        yield (value >> 1) ^ -(value & 1)
+        value = shift = 0
+
+
+def encode_sample(previous: Sample, sample: Sample) -> bytes:
+    """Encode `sample` as (seconds, rank, score) deltas from `previous`."""
+    out = bytearray()
+    _write_varint(out, int((sample[0] - previous[0]).total_seconds()))
+    _write_varint(out, sample[1] - previous[1])
+    _write_varint(out, sample[2] - previous[2])
+    return bytes(out)
+
+
+def decode_samples(period: date, data: bytes) -> List[Sample]:
+    """Inverse of encode_sample over a whole period; the first delta is from the period start."""
+    samples = []
+    taken_at, rank, score = _period_start(period), 0, 0
+    values = _read_varints(data)
+    for seconds in values:
+        taken_at += timedelta(seconds=seconds)
+        rank += next(values)
+        score += next(values)
+        samples.append((taken_at, rank, score))
+    return samples
+
+
+def take_snapshot(db: Session, now: Optional[datetime] = None) -> int:
+    """
+    Append a sample for every player whose rank or score changed since the
+    previous snapshot. Players that did not change get no sample; their last
+    one still holds. Returns the number of players sampled.
+    """
+    now = (now or datetime.utcnow()).replace(microsecond=0)
+    period = period_of(now)
+    since = get_meta(db, META_KEY)
+
+    query = "SELECT user_id, rank, total_score FROM leaderboard WHERE changed_at IS NOT NULL"
+    params = {}
+    if since is not None:
+        query += " AND changed_at > :since"
+        params["since"] = datetime.fromisoformat(since)
+    changed = db.execute(text(query), params).all()
+
+    sampled = 0
+    for start in range(0, len(changed), SNAPSHOT_BATCH_SIZE):
+        batch = changed[start:start + SNAPSHOT_BATCH_SIZE]
+        series = {
+            entry.user_id: entry
+            for entry in db.query(RankHistory).filter(
+                RankHistory.period == period,
+                RankHistory.user_id.in_([row.user_id for row in batch]),
+            )
+        }
+        for row in batch:
+            sample = (now, row.rank or 0, round((row.total_score or 0) * SCORE_SCALE))
+            entry = series.get(row.user_id)
+            if entry is None:
+                db.add(
+                    RankHistory(
+                        user_id=row.user_id,
+                        period=period,
+                        samples=encode_sample((_period_start(period), 0, 0), sample),
+                        last_at=now,
+                        last_rank=sample[1],
+                        last_score=sample[2],
+                    )
+                )
+            elif (entry.last_rank, entry.last_score) != sample[1:] and entry.last_at < now:
+                entry.samples = entry.samples + encode_sample(
+                    (entry.last_at, entry.last_rank, entry.last_score), sample
+                )
+                entry.last_at, entry.last_rank, entry.last_score = sample
+            else:
+                continue
+            sampled += 1
+        db.flush()
+
+    set_meta(db, META_KEY, now.isoformat())
+    db.commit()
+    return sampled
+
+
+def read_history(
+    db: Session, user_id: int, start: datetime, end: datetime
+) -> List[Tuple[datetime, int, float]]:
+    """
+    A player's (timestamp, rank, total_score) samples between start and end.
+    The sample that still holds at `start` comes first, moved to `start`,
+    so a player who did not change during the window gets one point, not none.
+    The rows are contiguous in the primary key, so this is one index range
+    read, plus one seek for the row before the window.
+    """
+    latest = (
+        db.query(RankHistory.last_at, RankHistory.last_rank, RankHistory.last_score)
+        .filter(RankHistory.user_id == user_id, RankHistory.period < period_of(start))
+        .order_by(RankHistory.period.desc())
+        .first()
+    )
+    rows = (
+        db.query(RankHistory.period, RankHistory.samples)
+        .filter(
+            RankHistory.user_id == user_id,
+            RankHistory.period >= period_of(start),
+            RankHistory.period <= period_of(end),
+        )
+        .order_by(RankHistory.period)
+    )
+    samples = []
+    for period, data in rows:
+        for sample in decode_samples(period, data):
+            if sample[0] < start:
+                latest = sample
+            elif sample[0] <= end:
+                samples.append(sample)
+    if latest is not None and start <= end and (not samples or samples[0][0] > start):
+        samples.insert(0, (start, latest[1], latest[2]))
+    return [(taken_at, rank, score / SCORE_SCALE) for taken_at, rank, score in samples]
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import bindparam, text
+
+from app.core.database import SessionLocal, run_db
+from app.services.broadcast import leaderboard_hub
+from app.services.leagues import LEAGUE_MODE, apply_division_moves
+from app.services.meta import get_meta
+from app.services.outbox import change_notifier, lock_outbox, log_events, take_pending_events
+from app.services.ranking import RANKS_MAINTAINED_KEY, apply_rank_moves, recompute_ranks
+
+RANK_COALESCE_WINDOW = float(os.getenv("RANK_COALESCE_WINDOW_SECONDS", "0.05"))
+RANK_RETRY_MAX_DELAY = float(os.getenv("RANK_RETRY_MAX_DELAY_SECONDS", "30"))
+
+logger = logging.getLogger(__name__)
+
+
+class RankMaintainer:
+    """
+    Refreshes stored ranks after score changes have been committed.
+
+    Every score change queues a "score" event (see append_events). A flush
+    takes all committed pending events in one batch, on a session of its
+    own and holding the outbox lock, moves the players they name from their
+    ranked key to their current key (see apply_rank_moves) and appends the
+    events, with the resulting rank events, to the change log. Only flushes
+    and whole-board jobs take the lock; submits keep committing meanwhile
+    and are picked up by the next flush. With several workers, whichever
+    flushes first applies the changes of all of them. A failed flush is
+    logged and leaves its events pending; it is retried after a delay that
+    doubles with every consecutive failure, up to RANK_RETRY_MAX_DELAY.
+
+    A flush runs `window` seconds after a submit, so a burst of submits for
+    the same player costs a single refresh. Only the rows between a player's
+    old and new position are touched; a player whose score did not change
+    costs nothing. In league mode only the movers' divisions are re-ranked,
+    and the published rank is the in-division rank.
+    """
+
+    def __init__(self, window: float = RANK_COALESCE_WINDOW):
+        self.window = window
+        self._flush_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._failures = 0
+
+    def schedule(self):
+        """Apply committed score changes within `window` seconds."""
+        if self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(
+                self._flush_later(self._retry_delay() if self._failures else self.window)
+            )
+
+    def _retry_delay(self) -> float:
+        return min(max(self.window, 0.1) * 2 ** self._failures, RANK_RETRY_MAX_DELAY)
+
+    async def flush(self):
+        """Apply everything committed so far (also used on shutdown)."""
+        self._flush_task = None
+        async with self._lock:
+            try:
+                ranks = await run_db(self._apply)
+            except Exception:
+                # Nothing was applied; the events wait for the retry
+                self._failures += 1
+                logger.exception(
+                    "Rank flush failed (%d in a row); retrying in %.1fs",
+                    self._failures,
+                    self._retry_delay(),
+                )
+                self.schedule()
+                return
+            self._failures = 0
+            if ranks is None:
+                return
+            # The events are in the log now
+            change_notifier.notify()
+            for user_id, (rank, total_score) in ranks.items():
+                leaderboard_hub.publish_rank(user_id, rank, total_score)
+
+    async def _flush_later(self, delay: float):
+        await asyncio.sleep(delay)
+        await self.flush()
+
+    def _apply(self) -> Optional[Dict[int, Tuple[int, float]]]:
+        """Movers' (rank, total_score), or None if there was nothing to do."""
+        db = SessionLocal()
+        try:
+            lock_outbox(db)
+            if get_meta(db, RANKS_MAINTAINED_KEY) is None:
+                # Stored ranks predate the ranked key; start from a full
+                # re-rank, which logs the pending events too
+                recompute_ranks(db, changed_at=datetime.utcnow())
+                db.commit()
+                return {}
+            events = take_pending_events(db)
+            if not events:
+                db.rollback()
+                return None
+
+            users = list({event.user_id for event in events if event.kind == "score"})
+            moves = {
+                row.user_id: (
+                    None if row.ranked_score is None else (row.ranked_score, row.ranked_tie_break),
+                    (row.total_score, row.tie_break),
+                )
+                for row in db.execute(
+                    text(
+                        """
+                        SELECT user_id, total_score, tie_break, ranked_score, ranked_tie_break
+                        FROM leaderboard WHERE user_id IN :users
+                        """
+                    ).bindparams(bindparam("users", expanding=True)),
+                    {"users": users},
+                )
+            }
+
+            apply_moves = apply_division_moves if LEAGUE_MODE else apply_rank_moves
+            kind = "division_rank" if LEAGUE_MODE else "rank"
+            ranks = {
+                user_id: (rank or 0, moves[user_id][1][0])
+                for user_id, rank in apply_moves(db, moves).items()
+            }
+            # Players shifted by one place are not announced, only the movers
+            log_events(db, (dict(event._mapping) for event in events))
+            log_events(
+                db,
+                (
+                    {"user_id": user_id, "kind": kind, "rank": rank, "total_score": total_score}
+                    for user_id, (rank, total_score) in ranks.items()
+                ),
+            )
+            db.commit()
+
+            # Watched players may have been passed by someone else
+            watched = leaderboard_hub.watched_users() - ranks.keys()
+            if watched:
+                rows = db.execute(
+                    text(
+                        "SELECT user_id, rank, total_score FROM leaderboard WHERE user_id IN :users"
+                    ).bindparams(bindparam("users", expanding=True)),
+                    {"users": list(watched)},
+                )
+                for row in rows:
+                    ranks[row.user_id] = (row.rank or 0, row.total_score)
+            return ranks
+
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+rank_maintainer = RankMaintainer()
@@ -0,0 +1,404 @@
+import os
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.services.meta import get_meta, set_meta
+from app.services.outbox import lock_outbox, log_reset
+
+RANK_MODES = ("competition", "dense", "ordinal")
+TIE_BREAKS = ("achieved_at", "user_id")
+
+# competition: ties share a rank and the next rank is skipped (1, 1, 3)
+# dense:       ties share a rank and no rank is skipped (1, 1, 2)
+# ordinal:     every player has their own rank; ties go by RANK_TIE_BREAK
+RANK_MODE = os.getenv("RANK_MODE", "competition")
+RANK_TIE_BREAK = os.getenv("RANK_TIE_BREAK", "achieved_at")
+if RANK_MODE not in RANK_MODES:
+    raise ValueError(f"Unknown RANK_MODE {RANK_MODE!r}; expected one of {list(RANK_MODES)}")
+if RANK_TIE_BREAK not in TIE_BREAKS:
+    raise ValueError(f"Unknown RANK_TIE_BREAK {RANK_TIE_BREAK!r}; expected one of {list(TIE_BREAKS)}")
+
+META_KEY = "rank_mode"
+RANK_SETTING = f"{RANK_MODE}:{RANK_TIE_BREAK}"
+DEFAULT_RANK_SETTING = "competition:achieved_at"
+# Set once the stored ranks are maintained from the ranked key; until then
+# the rank maintainer starts with a full re-rank
+RANKS_MAINTAINED_KEY = "ranks_maintained"
+
+# The board order. Every column descends, so a player's position is a
+# single row-value comparison on idx_leaderboard_rank_key.
+ORDER_BY = "total_score DESC, tie_break DESC, user_id DESC"
+# The same order over the key the stored ranks were computed from
+# (idx_leaderboard_ranked_key)
+RANKED_KEY = "(ranked_score, ranked_tie_break, user_id)"
+
+# (total_score, tie_break) of a player
+RankKey = Tuple[float, float]
+
+
+def tie_break_for(user_id: int, achieved_at: Optional[datetime]) -> float:
+    """
+    Tie-break value for a score reached at `achieved_at`; larger wins.
+    Without a time (scores from before tie-breaks were tracked, or rebuilt
+    from history) the value is 0, i.e. reached before anything recorded since.
+    """
+    if RANK_TIE_BREAK == "user_id":
+        return -float(user_id)
+    if achieved_at is None:
+        return 0.0
+    return -achieved_at.replace(tzinfo=timezone.utc).timestamp()
+
+
+def rank_window(partition: str = "") -> str:
+    """Window function computing the configured rank, optionally per partition."""
+    over = f"PARTITION BY {partition} ORDER BY" if partition else "ORDER BY"
+    if RANK_MODE == "ordinal":
+        return f"ROW_NUMBER() OVER ({over} {ORDER_BY})"
+    if RANK_MODE == "dense":
+        return f"DENSE_RANK() OVER ({over} total_score DESC)"
+    return f"RANK() OVER ({over} total_score DESC)"
+
+
+def ranks_in_order(scores: Iterable[float]) -> Iterator[int]:
+    """
+    The configured rank of each player, given the scores of a run of players
+    from the top of a board in board order; what rank_window computes in SQL.
+    """
+    previous = None
+    distinct = first = 0
+    for position, score in enumerate(scores, start=1):
+        if score != previous:
+            previous, distinct, first = score, distinct + 1, position
+        if RANK_MODE == "ordinal":
+            yield position
+        elif RANK_MODE == "dense":
+            yield distinct
+        else:
+            yield first
+
+
+def recompute_ranks(
+    db: Session, table: str = "leaderboard", changed_at: Optional[datetime] = None
+):
+    """
+    Rewrite the rank column of every row in `table` (leaderboard or its
+    staging copy) in the configured rank mode.
+    Only rows whose rank differs are written; on the leaderboard pass
+    `changed_at` to mark them for the next rank snapshot. On the leaderboard
+    this holds the outbox lock, and also stores the key each rank was
+    computed from, so score changes committed meanwhile are simply left to
+    the rank maintainer; any rank may have changed, so a reset event is
+    logged. The caller commits.
+    """
+    mark = ", changed_at = :changed_at" if changed_at is not None else ""
+    changed = f"{table}.rank IS NULL OR {table}.rank != ranked_players.new_rank"
+    if table == "leaderboard":
+        lock_outbox(db)
+        mark += (
+            ", ranked_score = ranked_players.total_score"
+            ", ranked_tie_break = ranked_players.tie_break"
+        )
+        changed += (
+            " OR leaderboard.ranked_score IS NULL"
+            " OR leaderboard.ranked_score != ranked_players.total_score"
+            " OR leaderboard.ranked_tie_break != ranked_players.tie_break"
+        )
+    db.execute(
+        text(
+            f"""
+        UPDATE {table}
+        SET rank = ranked_players.new_rank{mark}
+        FROM (
+            SELECT user_id, total_score, tie_break, {rank_window()} AS new_rank
+            FROM {table}
+        ) AS ranked_players
+        WHERE {table}.user_id = ranked_players.user_id
+          AND ({changed})
+    """
+        ),
+        {"changed_at": changed_at},
+    )
+    if table == "leaderboard":
+        mark_ranks_current(db)
+        log_reset(db)
+
+
+def mark_ranks_current(db: Session):
+    """
+    Record that the stored ranks agree with the ranked key of every row; the
+    rank maintainer carries on from there. The caller holds lock_outbox and
+    commits.
+    """
+    set_meta(db, RANKS_MAINTAINED_KEY, "true")
+
+
+def apply_rank_moves(
+    db: Session, moves: Dict[int, Tuple[Optional[RankKey], RankKey]]
+) -> Dict[int, int]:
+    """
+    Keep stored ranks correct after committed score changes, without
+    recomputing the board. `moves` maps user_id -> (the player's ranked key,
+    or None for a new player; current key).
+
+    Everything here works on the ranked key (ranked_score, ranked_tie_break),
+    which only holders of the outbox lock write: submits committing
+    meanwhile change total_score, not the board these ranks describe.
+
+    A bystander's rank is 1 + the number of "things" above it: players
+    (competition), distinct scores (dense) or sort keys (ordinal). The moves
+    add and remove such things at a few points, so the bystanders between
+    two neighbouring points all shift by the same amount and one range
+    UPDATE per stretch fixes them. The movers then take their new ranked
+    key and are placed relative to their nearest higher neighbour. Returns
+    the new rank of every mover. The caller holds lock_outbox and commits.
+    """
+    # A player whose key did not change is just another bystander
+    moves = {
+        user_id: (old, new) for user_id, (old, new) in moves.items() if old != new
+    }
+    if not moves:
+        return {}
+
+    movers = list(moves)
+    now = datetime.utcnow()
+    for low, high, delta in _shift_segments(db, moves):
+        conditions = ["user_id NOT IN :movers"]
+        params = {"movers": movers, "now": now, "delta": delta}
+        if low is not None:
+            conditions.append(_compare(">=", "low", low, params))
+        conditions.append(_compare("<", "high", high, params))
+        db.execute(
+            text(
+                f"""
+            UPDATE leaderboard
+            SET rank = rank + :delta, changed_at = :now
+            WHERE {" AND ".join(conditions)}
+            """
+            ).bindparams(bindparam("movers", expanding=True)),
+            params,
+        )
+    db.execute(
+        text(
+            """
+            UPDATE leaderboard SET ranked_score = :score, ranked_tie_break = :tie
+            WHERE user_id = :user_id
+            """
+        ),
+        [
+            {"user_id": user_id, "score": new_key[0], "tie": new_key[1]}
+            for user_id, (_, new_key) in moves.items()
+        ],
+    )
+
+    # Highest first, so a neighbour that also moved is already placed
+    ranks = {}
+    unplaced = set(movers)
+    for user_id, (_, new_key) in sorted(
+        moves.items(), key=lambda move: (*move[1][1], move[0]), reverse=True
+    ):
+        ranks[user_id] = _place(db, user_id, new_key, unplaced)
+        unplaced.discard(user_id)
+        db.execute(
+            text(
+                "UPDATE leaderboard SET rank = :rank, changed_at = :now WHERE user_id = :user_id"
+            ),
+            {"rank": ranks[user_id], "now": now, "user_id": user_id},
+        )
+    return ranks
+
+
+def _point(user_id: int, key: RankKey) -> tuple:
+    """Where a player sits on the line the rank mode counts along."""
+    if RANK_MODE == "ordinal":
+        return (key[0], key[1], user_id)
+    return (key[0],)
+
+
+def _compare(operator: str, name: str, point: tuple, params: dict) -> str:
+    if len(point) == 1:
+        params[name] = point[0]
+        return f"ranked_score {operator} :{name}"
+    params.update({f"{name}_score": point[0], f"{name}_tie": point[1], f"{name}_user": point[2]})
+    return f"{RANKED_KEY} {operator} (:{name}_score, :{name}_tie, :{name}_user)"
+
+
+def _shift_segments(
+    db: Session, moves: Dict[int, Tuple[Optional[RankKey], RankKey]]
+) -> List[Tuple[Optional[tuple], tuple, int]]:
+    """
+    (low, high, delta) stretches: bystanders with low <= point < high move
+    by delta; low None means everything below high.
+    """
+    changes = defaultdict(int)
+    if RANK_MODE == "dense":
+        added, removed = _distinct_score_changes(db, moves)
+        for score in added:
+            changes[(score,)] += 1
+        for score in removed:
+            changes[(score,)] -= 1
+    else:
+        for user_id, (old_key, new_key) in moves.items():
+            changes[_point(user_id, new_key)] += 1
+            if old_key is not None:
+                changes[_point(user_id, old_key)] -= 1
+
+    segments = []
+    delta = 0
+    points = sorted(changes, reverse=True)
+    for index, point in enumerate(points):
+        delta += changes[point]
+        if delta:
+            low = points[index + 1] if index + 1 < len(points) else None
+            segments.append((low, point, delta))
+    return segments
+
+
+def _distinct_score_changes(
+    db: Session, moves: Dict[int, Tuple[Optional[RankKey], RankKey]]
+) -> Tuple[Set[float], Set[float]]:
+    """Scores that nobody held before the moves, and scores nobody holds after."""
+    movers = list(moves)
+    old_scores = {old_key[0] for old_key, _ in moves.values() if old_key is not None}
+    new_scores = {new_key[0] for _, new_key in moves.values()}
+    added = {
+        score for score in new_scores - old_scores if not _held_by_others(db, score, movers)
+    }
+    removed = {
+        score for score in old_scores - new_scores if not _held_by_others(db, score, movers)
+    }
+    return added, removed
+
+
+def _held_by_others(db: Session, score: float, user_ids: Iterable[int]) -> bool:
+    return db.execute(
+        text(
+            "SELECT 1 FROM leaderboard WHERE ranked_score = :score AND user_id NOT IN :users LIMIT 1"
+        ).bindparams(bindparam("users", expanding=True)),
+        {"score": score, "users": list(user_ids)},
+    ).first() is not None
+
+
+def _place(db: Session, user_id: int, key: RankKey, unplaced: Set[int]) -> int:
+    """
+    Rank of a mover from the closest player above it. `unplaced` are the
+    movers (this one included) whose stored rank is not final yet.
+    """
+    score = key[0]
+    if RANK_MODE == "ordinal":
+        neighbour = db.execute(
+            text(
+                f"""
+                SELECT rank FROM leaderboard
+                WHERE {RANKED_KEY} > (:score, :tie, :user_id)
+                ORDER BY ranked_score, ranked_tie_break, user_id
+                LIMIT 1
+                """
+            ),
+            {"score": score, "tie": key[1], "user_id": user_id},
+        ).first()
+        if neighbour is None:
+            return 1
+        if neighbour.rank is not None:
+            return neighbour.rank + 1
+        return count_rank(db, user_id, key)
+
+    if RANK_MODE == "dense":
+        tied = db.execute(
+            text(
+                """
+                SELECT rank FROM leaderboard
+                WHERE ranked_score = :score AND user_id NOT IN :unplaced
+                LIMIT 1
+                """
+            ).bindparams(bindparam("unplaced", expanding=True)),
+            {"score": score, "unplaced": list(unplaced)},
+        ).first()
+        if tied is not None and tied.rank is not None:
+            return tied.rank
+
+    neighbour = db.execute(
+        text(
+            """
+            SELECT ranked_score, rank FROM leaderboard
+            WHERE ranked_score > :score
+            ORDER BY ranked_score
+            LIMIT 1
+            """
+        ),
+        {"score": score},
+    ).first()
+    if neighbour is None:
+        return 1
+    if neighbour.rank is None:
+        # Not ranked yet (e.g. straight after a migration); count instead
+        return count_rank(db, user_id, key)
+    if RANK_MODE == "dense":
+        return neighbour.rank + 1
+
+    # Competition: everyone at the neighbour's score or above outranks the mover
+    ties = db.execute(
+        text("SELECT COUNT(*) FROM leaderboard WHERE ranked_score = :score"),
+        {"score": neighbour.ranked_score},
+    ).scalar()
+    return neighbour.rank + ties
+
+
+def count_rank(db: Session, user_id: int, key: RankKey) -> int:
+    """
+    Rank of `key` among the ranked keys, by counting; for when no
+    neighbour's stored rank can be relied on.
+    """
+    if RANK_MODE == "ordinal":
+        query = f"SELECT COUNT(*) + 1 FROM leaderboard WHERE {RANKED_KEY} > (:score, :tie, :user_id)"
+    elif RANK_MODE == "dense":
+        query = "SELECT COUNT(DISTINCT ranked_score) + 1 FROM leaderboard WHERE ranked_score > :score"
+    else:
+        query = "SELECT COUNT(*) + 1 FROM leaderboard WHERE ranked_score > :score"
+    return db.execute(
+        text(query), {"score": key[0], "tie": key[1], "user_id": user_id}
+    ).scalar()
+
+
+def rank_mode_changed(db: Session) -> bool:
+    # Boards from before rank modes existed were ranked by competition
+    return (get_meta(db, META_KEY) or DEFAULT_RANK_SETTING) != RANK_SETTING
+
+
+def convert_rank_mode():
+    """
+    Re-rank the whole board after RANK_MODE or RANK_TIE_BREAK changed.
+    Runs in the background at startup; every worker starts it, and the
+    first to take the outbox lock does the work. Achievement times are not
+    known for existing scores, so switching tie-breaks resets every player
+    to the new tie-break's default (see tie_break_for).
+    """
+    db = SessionLocal()
+    try:
+        lock_outbox(db)
+        if not rank_mode_changed(db):
+            # Another worker converted the board
+            db.rollback()
+            return
+        previous = get_meta(db, META_KEY) or DEFAULT_RANK_SETTING
+        if previous.split(":")[1] != RANK_TIE_BREAK:
+            db.execute(
+                text(f"UPDATE leaderboard SET tie_break = {default_tie_break_sql()}")
+            )
+        recompute_ranks(db, changed_at=datetime.utcnow())
+        set_meta(db, META_KEY, RANK_SETTING)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def default_tie_break_sql() -> str:
+    """tie_break_for(user_id, None) as a SQL expression."""
+    return "-user_id" if RANK_TIE_BREAK == "user_id" else "0"
@@ -0,0 +1,163 @@
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from redis import Redis
+from redis.exceptions import RedisError
+from starlette.requests import Request
+
+from app.core.database import MAX_OVERFLOW, POOL_SIZE
+
+# Sustained submissions per second and burst size, per client address and
+# per user_id; a rate of 0 turns that limit off
+CLIENT_RATE = float(os.getenv("RATE_LIMIT_CLIENT_PER_SECOND", "100"))
+CLIENT_BURST = float(os.getenv("RATE_LIMIT_CLIENT_BURST", "200"))
+USER_RATE = float(os.getenv("RATE_LIMIT_USER_PER_SECOND", "20"))
+USER_BURST = float(os.getenv("RATE_LIMIT_USER_BURST", "40"))
+# Set to share the buckets between workers, e.g. redis://localhost:6379/1
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+# Header naming the client, e.g. X-Client-Id or X-Real-IP. Behind a proxy or
+# load balancer every request comes from its address, so without this all
+# game servers behind it share one bucket. Only set it when the proxy sets
+# or overwrites the header: clients could otherwise pick their own bucket.
+CLIENT_HEADER = os.getenv("RATE_LIMIT_CLIENT_HEADER")
+MAX_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", "100000"))
+
+# Submissions handled at once; beyond that the pool would make them queue
+SUBMIT_MAX_CONCURRENCY = int(os.getenv("SUBMIT_MAX_CONCURRENCY", str(POOL_SIZE + MAX_OVERFLOW)))
+
+# Refill and take one token atomically; returns the seconds to wait (as a
+# string, integer replies would truncate it), 0 when the call is allowed.
+# Uses the Redis clock so that workers agree on time.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+local tokens = tonumber(bucket[1]) or burst
+local at = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(now - at, 0) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'at', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class TokenBucketLimiter:
+    """
+    Token buckets keyed by any string, held in this process.
+
+    A bucket holds up to `burst` tokens and refills at `rate` per second;
+    each call takes one. Only the most recently used MAX_BUCKETS buckets are
+    kept: an evicted bucket had been idle the longest, and idle buckets are
+    full anyway.
+    """
+
+    def __init__(self, max_buckets: int = MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        # key -> (tokens, monotonic time of the last refill)
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        """Take a token; returns 0, or the seconds until one is available."""
+        now = time.monotonic()
+        tokens, at = self._buckets.pop(key, (burst, now))
+        tokens = min(burst, tokens + (now - at) * rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_buckets:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class RedisTokenBucketLimiter:
+    """
+    The same buckets kept in Redis so that every worker shares them. Costs a
+    round trip per call; if Redis is unreachable the process falls back to
+    its own buckets rather than rejecting traffic.
+    """
+
+    def __init__(self, redis: Redis, prefix: str = "rate-limit:"):
+        self.prefix = prefix
+        self._script = redis.register_script(TOKEN_BUCKET_SCRIPT)
+        self._fallback = TokenBucketLimiter()
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        try:
+            return float(self._script(keys=[self.prefix + key], args=[rate, burst]))
+        except RedisError:
+            return self._fallback.take(key, rate, burst)
+
+
+class SubmitLimiter:
+    """Per-client and per-user rate limits on /submit."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+
+    def retry_after(self, client: str, user_id: int) -> float:
+        """0 if the submission may go ahead, else the seconds to wait."""
+        if CLIENT_RATE > 0:
+            wait = self.buckets.take(f"client:{client}", CLIENT_RATE, CLIENT_BURST)
+            if wait:
+                return wait
+        if USER_RATE > 0:
+            return self.buckets.take(f"user:{user_id}", USER_RATE, USER_BURST)
+        return 0.0
+
+
+class AdmissionGate:
+    """
+    Caps the submissions in progress. A submission over the cap is turned
+    away at once instead of queueing for a connection for up to pool_timeout.
+    """
+
+    def __init__(self, limit: int = SUBMIT_MAX_CONCURRENCY):
+        self.limit = limit
+        self.active = 0
+
+    def try_enter(self) -> bool:
+        if self.active >= self.limit:
+            return False
+        self.active += 1
+        return True
+
+    def leave(self):
+        self.active -= 1
+
+
+def client_identity(request: Request, header: Optional[str] = CLIENT_HEADER) -> str:
+    """The key of the caller's client bucket: `header` if set and present, else the address."""
+    if header:
+        value = request.headers.get(header)
+        if value:
+            return value
+    return request.client.host if request.client else ""
+
+
+def retry_after_header(wait: float) -> dict:
+    return {"Retry-After": str(max(1, math.ceil(wait)))}
+
+
+submit_limiter = SubmitLimiter(
+    # Short timeouts: a slow Redis should fall back, not stall submissions
+    RedisTokenBucketLimiter(
+        Redis.from_url(RATE_LIMIT_REDIS_URL, socket_timeout=0.1, socket_connect_timeout=0.1)
+    )
+    if RATE_LIMIT_REDIS_URL
+    else TokenBucketLimiter()
+)
+submit_gate = AdmissionGate()
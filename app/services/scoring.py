@@ -0,0 +1,348 @@
+import bisect
+import itertools
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Iterator, Optional, Tuple
+
+from sqlalchemy import DateTime, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.models import RebuildCheckpoint
+from app.services.meta import get_meta, set_meta
+from app.services.outbox import lock_outbox, log_events
+from app.services.ranking import default_tie_break_sql, recompute_ranks
+
+SCORING_RULE = os.getenv("SCORING_RULE", "average")
+BEST_N = int(os.getenv("SCORING_BEST_N", "5"))
+DECAY_HALF_LIFE_DAYS = float(os.getenv("SCORING_DECAY_HALF_LIFE_DAYS", "30"))
+BACKFILL_CHUNK_SIZE = int(os.getenv("SCORING_BACKFILL_CHUNK_SIZE", "10000"))
+# A backfill whose checkpoint was not advanced for this long is taken over
+# by another worker; one chunk must take less than this
+BACKFILL_LEASE = float(os.getenv("SCORING_BACKFILL_LEASE_SECONDS", "300"))
+# How often the other workers check whether it finished or stalled
+BACKFILL_POLL_INTERVAL = 5
+
+# Decayed scores are stored relative to this instant so that stored values of
+# players who last played at different times remain directly comparable.
+DECAY_EPOCH = datetime(2025, 1, 1)
+
+META_KEY = "scoring_rule"
+
+
+class ScoringRule(ABC):
+    """
+    How a player's sessions combine into leaderboard.total_score.
+
+    A rule keeps a small JSON-serialisable state per player and folds each
+    new session into it in O(1), so the leaderboard never has to re-read a
+    player's history on submit. Rules must be order-independent, which lets
+    quarantined sessions be released later and chunks be rebuilt in any order.
+    """
+
+    name = None
+
+    @abstractmethod
+    def initial_state(self) -> dict:
+        ...
+
+    @abstractmethod
+    def update(self, state: dict, score: int, timestamp: datetime) -> dict:
+        ...
+
+    @abstractmethod
+    def value(self, state: dict) -> float:
+        ...
+
+    def from_totals(self, count: int, total: int) -> Optional[dict]:
+        """
+        Build the state from COUNT(*)/SUM(score) alone, when the rule allows
+        it, so bulk jobs can aggregate in SQL instead of replaying sessions.
+        """
+        return None
+
+
+class SumRule(ScoringRule):
+    name = "sum"
+
+    def initial_state(self) -> dict:
+        return {"sum": 0}
+
+    def update(self, state: dict, score: int, timestamp: datetime) -> dict:
+        return {"sum": state["sum"] + score}
+
+    def value(self, state: dict) -> float:
+        return float(state["sum"])
+
+    def from_totals(self, count: int, total: int) -> Optional[dict]:
+        return {"sum": total}
+
+
+class AverageRule(ScoringRule):
+    name = "average"
+
+    def initial_state(self) -> dict:
+        return {"sum": 0, "n": 0}
+
+    def update(self, state: dict, score: int, timestamp: datetime) -> dict:
+        return {"sum": state["sum"] + score, "n": state["n"] + 1}
+
+    def value(self, state: dict) -> float:
+        return state["sum"] / state["n"] if state["n"] else 0.0
+
+    def from_totals(self, count: int, total: int) -> Optional[dict]:
+        return {"sum": total, "n": count}
+
+
+class BestNRule(ScoringRule):
+    """Sum of a player's N best scores."""
+
+    def __init__(self, n: int):
+        self.n = n
+        self.name = f"best_{n}"
+
+    def initial_state(self) -> dict:
+        return {"best": []}
+
+    def update(self, state: dict, score: int, timestamp: datetime) -> dict:
+        best = list(state["best"])
+        bisect.insort(best, score)
+        return {"best": best[-self.n:]}
+
+    def value(self, state: dict) -> float:
+        return float(sum(state["best"]))
+
+
+class DecayedSumRule(ScoringRule):
+    """
+    Sum of scores where each session's weight halves every `half_life_days`.
+
+    Instead of decaying every player over time, each session is scaled up by
+    2 ** (age relative to DECAY_EPOCH / half-life). Ordering is identical to
+    decaying everyone to "now", and untouched rows never need rewriting.
+    """
+
+    def __init__(self, half_life_days: float):
+        self.half_life_seconds = half_life_days * 86400
+        self.name = f"decayed_{half_life_days:g}d"
+
+    def initial_state(self) -> dict:
+        return {"value": 0.0}
+
+    def update(self, state: dict, score: int, timestamp: datetime) -> dict:
+        age = (timestamp - DECAY_EPOCH).total_seconds()
+        return {"value": state["value"] + score * 2 ** (age / self.half_life_seconds)}
+
+    def value(self, state: dict) -> float:
+        return state["value"]
+
+
+def get_rule(name: str) -> ScoringRule:
+    rules = {
+        "sum": lambda: SumRule(),
+        "average": lambda: AverageRule(),
+        "best_n": lambda: BestNRule(BEST_N),
+        "decayed_sum": lambda: DecayedSumRule(DECAY_HALF_LIFE_DAYS),
+    }
+    if name not in rules:
+        raise ValueError(f"Unknown scoring rule {name!r}; expected one of {sorted(rules)}")
+    return rules[name]()
+
+
+active_rule = get_rule(SCORING_RULE)
+
+
+def aggregate_users(
+    db: Session, rule: ScoringRule, low: int, high: int
+) -> Iterator[Tuple[int, int, float, str]]:
+    """
+    Compute (user_id, total_sessions, total_score, rule_state) from
+    game_sessions for every player with low <= user_id <= high.
+    """
+    params = {"low": low, "high": high}
+    if rule.from_totals(0, 0) is not None:
+        rows = db.execute(
+            text("""
+                SELECT user_id, COUNT(*) AS total_sessions, SUM(score) AS total
+                FROM game_sessions
+                WHERE user_id BETWEEN :low AND :high
+                GROUP BY user_id
+            """),
+            params,
+        )
+        for row in rows:
+            state = rule.from_totals(row.total_sessions, row.total)
+            yield row.user_id, row.total_sessions, rule.value(state), json.dumps(state)
+        return
+
+    rows = db.execute(
+        text("""
+            SELECT user_id, score, timestamp
+            FROM game_sessions
+            WHERE user_id BETWEEN :low AND :high
+            ORDER BY user_id
+        """).columns(timestamp=DateTime),
+        params,
+    )
+    for user_id, sessions in itertools.groupby(rows, key=lambda row: row.user_id):
+        state = rule.initial_state()
+        total_sessions = 0
+        for session in sessions:
+            state = rule.update(state, session.score, session.timestamp)
+            total_sessions += 1
+        yield user_id, total_sessions, rule.value(state), json.dumps(state)
+
+
+def scoring_rule_changed(db: Session, rule: ScoringRule = active_rule) -> bool:
+    return get_meta(db, META_KEY) != rule.name
+
+
+def _claim_backfill(db: Session, job: str) -> Optional[Tuple[int, datetime]]:
+    """
+    Make this process the one running `job`: create its checkpoint, or take
+    over one that was not advanced for BACKFILL_LEASE. Returns the last
+    converted user id and the lease (the checkpoint's updated_at), or None
+    if another process holds the job.
+    """
+    checkpoint = db.get(RebuildCheckpoint, job)
+    if checkpoint is None:
+        now = datetime.utcnow()
+        db.add(RebuildCheckpoint(job=job, last_user_id=0, started_at=now, updated_at=now))
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another worker started at the same time
+            db.rollback()
+            return None
+        return 0, now
+
+    last_user_id, seen = checkpoint.last_user_id, checkpoint.updated_at
+    if seen > datetime.utcnow() - timedelta(seconds=BACKFILL_LEASE):
+        db.rollback()
+        return None
+    lease = _renew_lease(db, job, seen, last_user_id)
+    db.commit()
+    return (last_user_id, lease) if lease else None
+
+
+def _renew_lease(db: Session, job: str, lease: datetime, last_user_id: int) -> Optional[datetime]:
+    """
+    Advance the checkpoint if this process still holds `lease`; the new
+    lease, or None if another process took the job over. The caller commits.
+    """
+    now = datetime.utcnow()
+    renewed = (
+        db.query(RebuildCheckpoint)
+        .filter(RebuildCheckpoint.job == job, RebuildCheckpoint.updated_at == lease)
+        .update({"last_user_id": last_user_id, "updated_at": now}, synchronize_session=False)
+    )
+    return now if renewed else None
+
+
+def backfill_scoring_rule(rule: ScoringRule = active_rule, chunk_size: int = BACKFILL_CHUNK_SIZE):
+    """
+    Convert every leaderboard row to `rule`, one user-id chunk per transaction.
+
+    Runs in the background after the configured rule changes. Every worker
+    starts it, but only the one holding the checkpoint works; the others
+    wait and take over if it stops advancing. Rows that the submit path
+    already converted on its own are left alone, and progress is
+    checkpointed so a restart continues instead of starting over. Each chunk
+    logs a score event per converted player, holding the outbox lock. Ranks
+    are recomputed once at the end.
+    """
+    db = SessionLocal()
+    job = f"scoring:{rule.name}"
+    for_update = "" if "sqlite" in str(db.bind.url) else " FOR UPDATE"
+    try:
+        while True:
+            if not scoring_rule_changed(db, rule):
+                # Another worker finished it
+                return
+            claimed = _claim_backfill(db, job)
+            if claimed is not None:
+                break
+            time.sleep(BACKFILL_POLL_INTERVAL)
+        last_user_id, lease = claimed
+
+        max_user_id = db.execute(text("SELECT MAX(user_id) FROM leaderboard")).scalar() or 0
+        for low in range(last_user_id + 1, max_user_id + 1, chunk_size):
+            high = low + chunk_size - 1
+            lock_outbox(db)
+            # Rows converted by a submit meanwhile are skipped
+            unconverted = {
+                user_id
+                for (user_id,) in db.execute(
+                    text(
+                        f"""
+                        SELECT user_id FROM leaderboard
+                        WHERE user_id BETWEEN :low AND :high
+                          AND (scoring_rule IS NULL OR scoring_rule != :scoring_rule)
+                        {for_update}
+                        """
+                    ),
+                    {"low": low, "high": high, "scoring_rule": rule.name},
+                )
+            }
+            rows = [
+                {
+                    "user_id": user_id,
+                    "total_sessions": total_sessions,
+                    "total_score": total_score,
+                    "rule_state": rule_state,
+                    "scoring_rule": rule.name,
+                    "changed_at": datetime.utcnow(),
+                }
+                for user_id, total_sessions, total_score, rule_state
+                in aggregate_users(db, rule, low, high)
+                if user_id in unconverted
+            ]
+            if rows:
+                db.execute(
+                    text(f"""
+                        UPDATE leaderboard
+                        SET tie_break = CASE WHEN total_score = :total_score
+                                             THEN tie_break ELSE {default_tie_break_sql()} END,
+                            total_score = :total_score,
+                            total_sessions = :total_sessions,
+                            rule_state = :rule_state,
+                            scoring_rule = :scoring_rule,
+                            changed_at = :changed_at
+                        WHERE user_id = :user_id
+                    """),
+                    rows,
+                )
+                log_events(
+                    db,
+                    (
+                        {"user_id": row["user_id"], "kind": "score", "total_score": row["total_score"]}
+                        for row in rows
+                    ),
+                )
+            lease = _renew_lease(db, job, lease, high)
+            if lease is None:
+                db.rollback()
+                return
+            db.commit()
+
+        recompute_ranks(db, changed_at=datetime.utcnow())
+        set_meta(db, META_KEY, rule.name)
+        finished = (
+            db.query(RebuildCheckpoint)
+            .filter(RebuildCheckpoint.job == job, RebuildCheckpoint.updated_at == lease)
+            .delete(synchronize_session=False)
+        )
+        if not finished:
+            db.rollback()
+            return
+        db.commit()
+
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,200 @@
+import asyncio
+import contextlib
+import io
+import itertools
+import random
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, List
+
+# Rows passed by the player moved in the function/apply_rank_moves case
+RANK_MOVE_DISTANCE = 25
+
+# Players changed between two snapshots in the function/take_snapshot case
+SNAPSHOT_CHANGED_PLAYERS = 100
+
+# Concurrent submissions per call of the asgi/submit_score_zipf case, with
+# user ids drawn from a Zipf distribution (user 1 is the hottest)
+CONTENTION_BURST = 50
+ZIPF_EXPONENT = 1.1
+
+
+@dataclass
+class Case:
+    """One benchmarked operation; `run` performs a single measured call."""
+
+    name: str
+    run: Callable[[], Awaitable[None]]
+    heavy: bool = False
+
+
+def function_cases(users: int, seed: int) -> List[Case]:
+    """Call the endpoint functions directly, each with a fresh session like get_db."""
+    from app.core.database import SessionLocal
+    from app.routers.leaderboard import (
+        _update_leaderboard_ranks,
+        get_player_rank,
+        get_top_leaderboard,
+        submit_score,
+    )
+    from app.schemas import ScoreSubmission
+    from app.services.rank_history import take_snapshot
+    from app.services.rank_maintenance import rank_maintainer
+    from app.services.ranking import apply_rank_moves
+    from sqlalchemy import text
+    from scripts.populate_db import populate_leaderboard
+
+    rng = random.Random(seed)
+
+    async def run_submit_score():
+        db = SessionLocal()
+        try:
+            await submit_score(
+                ScoreSubmission(user_id=rng.randint(1, users), score=rng.randint(1, 10000)),
+                db,
+            )
+            # Include the rank refresh that would otherwise run after the window
+            await rank_maintainer.flush()
+        finally:
+            db.close()
+
+    async def run_get_top_leaderboard():
+        db = SessionLocal()
+        try:
+            await get_top_leaderboard(limit=10, db=db)
+        finally:
+            db.close()
+
+    async def run_get_player_rank():
+        db = SessionLocal()
+        try:
+            await get_player_rank(rng.randint(1, users), db=db)
+        finally:
+            db.close()
+
+    async def run_apply_rank_moves():
+        # One player passing RANK_MOVE_DISTANCE others; cost should depend on
+        # that distance, not on the size of the board
+        db = SessionLocal()
+        try:
+            user_id = rng.randint(1, users)
+            player = db.execute(
+                text("SELECT total_score, tie_break FROM leaderboard WHERE user_id = :user_id"),
+                {"user_id": user_id},
+            ).first()
+            if player is None:
+                return
+            old_score, tie_break = player
+            comparison, order = rng.choice((("<", "DESC"), (">", "ASC")))
+            passed = db.execute(
+                text(
+                    f"""
+                SELECT total_score FROM leaderboard
+                WHERE total_score {comparison} :score
+                ORDER BY total_score {order}
+                LIMIT 1 OFFSET :offset
+                """
+                ),
+                {"score": old_score, "offset": RANK_MOVE_DISTANCE - 1},
+            ).scalar()
+            if passed is None:
+                return
+            new_score = passed + (0.5 if comparison == ">" else -0.5)
+            db.execute(
+                text("UPDATE leaderboard SET total_score = :score WHERE user_id = :user_id"),
+                {"score": new_score, "user_id": user_id},
+            )
+            apply_rank_moves(db, {user_id: ((old_score, tie_break), (new_score, tie_break))})
+            db.commit()
+        finally:
+            db.close()
+
+    async def run_take_snapshot():
+        # Cost should follow the number of changed players, not the board size.
+        # The first (warm-up) call records every player.
+        db = SessionLocal()
+        try:
+            db.execute(
+                text("UPDATE leaderboard SET changed_at = :now WHERE user_id = :user_id"),
+                [
+                    {"now": datetime.utcnow(), "user_id": rng.randint(1, users)}
+                    for _ in range(SNAPSHOT_CHANGED_PLAYERS)
+                ],
+            )
+            db.commit()
+            take_snapshot(db)
+        finally:
+            db.close()
+
+    async def run_update_leaderboard_ranks():
+        db = SessionLocal()
+        try:
+            await _update_leaderboard_ranks(db)
+        finally:
+            db.close()
+
+    async def run_populate_leaderboard():
+        db = SessionLocal()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                populate_leaderboard(db)
+        finally:
+            db.close()
+
+    return [
+        Case("function/submit_score", run_submit_score),
+        Case("function/get_top_leaderboard", run_get_top_leaderboard),
+        Case("function/get_player_rank", run_get_player_rank),
+        Case("function/apply_rank_moves", run_apply_rank_moves),
+        Case("function/take_snapshot", run_take_snapshot),
+        Case("function/_update_leaderboard_ranks", run_update_leaderboard_ranks, heavy=True),
+        Case("function/populate_leaderboard", run_populate_leaderboard, heavy=True),
+    ]
+
+
+def asgi_cases(client, users: int, seed: int) -> List[Case]:
+    """Go through the full FastAPI stack in-process via an httpx ASGI client."""
+    rng = random.Random(seed)
+
+    async def run_submit_score():
+        response = await client.post(
+            "/api/leaderboard/submit",
+            json={"user_id": rng.randint(1, users), "score": rng.randint(1, 10000)},
+        )
+        response.raise_for_status()
+
+    # Cumulative Zipf weights over user ids, for rng.choices
+    zipf_weights = list(
+        itertools.accumulate(1 / rank ** ZIPF_EXPONENT for rank in range(1, users + 1))
+    )
+    user_ids = range(1, users + 1)
+
+    async def run_submit_score_zipf():
+        # A few hot players take most of the burst, as with streamers and bots
+        burst = rng.choices(user_ids, cum_weights=zipf_weights, k=CONTENTION_BURST)
+        responses = await asyncio.gather(
+            *(
+                client.post(
+                    "/api/leaderboard/submit",
+                    json={"user_id": user_id, "score": rng.randint(1, 10000)},
+                )
+                for user_id in burst
+            )
+        )
+        for response in responses:
+            response.raise_for_status()
+
+    async def run_get_top_leaderboard():
+        response = await client.get("/api/leaderboard/top", params={"limit": 10})
+        response.raise_for_status()
+
+    async def run_get_player_rank():
+        response = await client.get(f"/api/leaderboard/rank/{rng.randint(1, users)}")
+        response.raise_for_status()
+
+    return [
+        Case("asgi/submit_score", run_submit_score),
+        Case("asgi/submit_score_zipf", run_submit_score_zipf),
+        Case("asgi/get_top_leaderboard", run_get_top_leaderboard),
+        Case("asgi/get_player_rank", run_get_player_rank),
+    ]
@@ -0,0 +1,79 @@
+import random
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import text
+
+SCALES = {
+    "10k": 10_000,
+    "1m": 1_000_000,
+    "10m": 10_000_000,
+}
+
+# Sessions per user; keeps the user/session ratio of the populate script
+SESSIONS_PER_USER = 5
+
+BATCH_SIZE = 10_000
+
+# Fixed so that two builds with the same seed produce identical rows
+BASE_TIME = datetime(2026, 1, 1)
+
+
+def build_dataset(sessions: int, seed: int) -> int:
+    """
+    Fill the database behind DATABASE_URL with a deterministic dataset:
+    users, `sessions` game sessions drawn from `seed`, and a leaderboard
+    built by the regular rebuild job. Returns the number of users.
+    """
+    # The app reads DATABASE_URL at import time, so only import it here
+    from app.core.database import SessionLocal, engine
+    from app.models import Base
+    from scripts.rebuild_leaderboard import run_rebuild
+
+    Base.metadata.create_all(bind=engine)
+
+    users = max(sessions // SESSIONS_PER_USER, 1)
+    rng = random.Random(seed)
+
+    with engine.begin() as conn:
+        for table in ("leaderboard", "quarantined_sessions", "game_sessions", "users"):
+            conn.execute(text(f"DELETE FROM {table}"))
+
+    with engine.begin() as conn:
+        for start in range(0, users, BATCH_SIZE):
+            conn.execute(
+                text("INSERT INTO users (id, username, join_date) VALUES (:id, :username, :join_date)"),
+                [
+                    {"id": i, "username": f"user_{i}", "join_date": BASE_TIME}
+                    for i in range(start + 1, min(start + BATCH_SIZE, users) + 1)
+                ],
+            )
+
+    for start in range(0, sessions, BATCH_SIZE):
+        batch = [
+            {
+                "user_id": rng.randint(1, users),
+                "score": rng.randint(1, 10000),
+                "game_mode": rng.choice(("SOLO", "TEAM")),
+                "timestamp": BASE_TIME - timedelta(seconds=rng.randint(0, 365 * 86400)),
+            }
+            for _ in range(min(BATCH_SIZE, sessions - start))
+        ]
+        with engine.begin() as conn:
+            conn.execute(
+                text("""
+                    INSERT INTO game_sessions (user_id, score, game_mode, timestamp)
+                    VALUES (:user_id, :score, :game_mode, :timestamp)
+                """),
+                batch,
+            )
+        if (start + BATCH_SIZE) % 1_000_000 == 0:
+            click.echo(f"Inserted {start + BATCH_SIZE} game sessions...")
+
+    db = SessionLocal()
+    try:
+        run_rebuild(db, restart=True)
+    finally:
+        db.close()
+
+    return users
@@ -0,0 +1,237 @@
+"""
+Benchmarks for the leaderboard hot paths.
+
+    python -m benchmarks.run run --scale 10k --output results.json
+    python -m benchmarks.run run --database postgresql://... --compare baseline.json
+    python -m benchmarks.run compare baseline.json results.json
+"""
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import click
+
+from benchmarks.dataset import SCALES, SESSIONS_PER_USER
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), ".data")
+MODELS_DIR = os.path.join(os.path.dirname(__file__), "..", "app", "models")
+
+
+def _schema_digest() -> str:
+    """Short hash of the model definitions, so cached datasets follow schema changes."""
+    digest = hashlib.sha1()
+    for path in sorted(glob.glob(os.path.join(MODELS_DIR, "*.py"))):
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:8]
+
+
+def _prepare_database(database: str, scale: str, seed: int, rebuild: bool) -> bool:
+    """
+    Point DATABASE_URL at the benchmark database and return whether it still
+    needs to be built. SQLite datasets are cached and every run works on a
+    fresh copy, so results do not drift with the writes of earlier runs.
+    """
+    if database != "sqlite":
+        os.environ["DATABASE_URL"] = database
+        return rebuild
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    name = f"{scale}-seed{seed}-{_schema_digest()}.db"
+    cached = os.path.join(DATA_DIR, name)
+    working = os.path.join(DATA_DIR, f"work-{name}")
+    os.environ["DATABASE_URL"] = f"sqlite:///{working}"
+
+    if rebuild or not os.path.exists(cached):
+        if os.path.exists(working):
+            os.remove(working)
+        return True
+    shutil.copyfile(cached, working)
+    return False
+
+
+def _summarize(samples: List[float]) -> Dict[str, float]:
+    samples_ms = sorted(sample * 1000 for sample in samples)
+    return {
+        "n": len(samples_ms),
+        "mean_ms": statistics.fmean(samples_ms),
+        "median_ms": statistics.median(samples_ms),
+        "p95_ms": samples_ms[min(len(samples_ms) - 1, int(len(samples_ms) * 0.95))],
+        "min_ms": samples_ms[0],
+        "max_ms": samples_ms[-1],
+    }
+
+
+async def _measure(cases, iterations: int, heavy_iterations: int, warmup: int) -> Dict[str, dict]:
+    results = {}
+    for case in cases:
+        count = heavy_iterations if case.heavy else iterations
+        for _ in range(0 if case.heavy else warmup):
+            await case.run()
+
+        samples = []
+        for _ in range(count):
+            start = time.perf_counter()
+            await case.run()
+            samples.append(time.perf_counter() - start)
+
+        results[case.name] = _summarize(samples)
+        click.echo(
+            f"{case.name:<40} median {results[case.name]['median_ms']:9.3f} ms"
+            f"  p95 {results[case.name]['p95_ms']:9.3f} ms  (n={count})"
+        )
+    return results
+
+
+async def _run_cases(users: int, seed: int, only, iterations: int, heavy_iterations: int, warmup: int):
+    import httpx
+    from fastapi_cache import FastAPICache
+    from fastapi_cache.backends.inmemory import InMemoryBackend
+
+    from app.main import app
+    from benchmarks.cases import asgi_cases, function_cases
+
+    # Measure the endpoints themselves, not the response cache
+    FastAPICache.init(InMemoryBackend(), prefix="bench:", enable=False)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        cases = function_cases(users, seed) + asgi_cases(client, users, seed)
+        if only:
+            cases = [case for case in cases if any(part in case.name for part in only)]
+        return await _measure(cases, iterations, heavy_iterations, warmup)
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare_results(baseline: dict, current: dict, threshold: float) -> List[str]:
+    """Print a median-to-median comparison and return the regressed case names."""
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            click.echo(f"{name:<40} new case")
+            continue
+        change = result["median_ms"] / base["median_ms"] - 1 if base["median_ms"] else 0.0
+        marker = ""
+        if change > threshold:
+            regressions.append(name)
+            marker = "  <-- REGRESSION"
+        click.echo(
+            f"{name:<40} {base['median_ms']:9.3f} -> {result['median_ms']:9.3f} ms"
+            f"  ({change:+.1%}){marker}"
+        )
+    for name in baseline["results"].keys() - current["results"].keys():
+        click.echo(f"{name:<40} missing from current results")
+    return regressions
+
+
+@click.group()
+def cli():
+    """Leaderboard benchmark suite"""
+    pass
+
+
+@cli.command()
+@click.option('--scale', type=click.Choice(list(SCALES)), default='10k', help='Number of game sessions in the dataset')
+@click.option('--database', default='sqlite', help="'sqlite' or a PostgreSQL URL to benchmark against")
+@click.option('--seed', default=42, help='Seed for the dataset and the request parameters')
+@click.option('--iterations', default=200, help='Measured calls per case')
+@click.option('--heavy-iterations', default=3, help='Measured calls for full-board cases')
+@click.option('--warmup', default=10, help='Unmeasured calls before each case')
+@click.option('--only', multiple=True, help='Only run cases whose name contains this text')
+@click.option('--rebuild', is_flag=True, help='Rebuild the dataset even if one exists')
+@click.option('--output', type=click.Path(), help='Write results as JSON to this file')
+@click.option('--compare', type=click.Path(exists=True), help='Baseline results JSON to compare against')
+@click.option('--threshold', default=0.10, help='Allowed median slowdown before a case counts as a regression')
+def run(scale, database, seed, iterations, heavy_iterations, warmup, only, rebuild, output, compare, threshold):
+    """Build (or reuse) a seeded dataset and time the hot paths."""
+    sessions = SCALES[scale]
+    users = max(sessions // SESSIONS_PER_USER, 1)
+    # The cases replay far more traffic from one client than the limits allow
+    for limit in ("RATE_LIMIT_CLIENT_PER_SECOND", "RATE_LIMIT_USER_PER_SECOND"):
+        os.environ.setdefault(limit, "0")
+    needs_build = _prepare_database(database, scale, seed, rebuild)
+
+    if not needs_build and database != "sqlite":
+        from app.core.database import engine
+        from sqlalchemy import inspect, text
+
+        with engine.connect() as conn:
+            needs_build = not inspect(conn).has_table("users") or (
+                conn.execute(text("SELECT COUNT(*) FROM users")).scalar() != users
+            )
+
+    if needs_build:
+        from benchmarks.dataset import build_dataset
+
+        click.echo(f"Building {scale} dataset ({sessions} sessions, {users} users)...")
+        start = time.time()
+        build_dataset(sessions, seed)
+        click.echo(f"Dataset built in {time.time() - start:.1f} seconds")
+        if database == "sqlite":
+            working = os.environ["DATABASE_URL"][len("sqlite:///"):]
+            shutil.copyfile(working, os.path.join(DATA_DIR, f"{scale}-seed{seed}-{_schema_digest()}.db"))
+
+    from app.core.database import engine
+
+    results = asyncio.run(_run_cases(users, seed, only, iterations, heavy_iterations, warmup))
+    report = {
+        "meta": {
+            "scale": scale,
+            "sessions": sessions,
+            "users": users,
+            "seed": seed,
+            "database": engine.dialect.name,
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        click.echo(f"Results written to {output}")
+
+    if compare:
+        with open(compare) as f:
+            baseline = json.load(f)
+        if compare_results(baseline, report, threshold):
+            sys.exit(1)
+
+
+@cli.command()
+@click.argument('baseline', type=click.Path(exists=True))
+@click.argument('current', type=click.Path(exists=True))
+@click.option('--threshold', default=0.10, help='Allowed median slowdown before a case counts as a regression')
+def compare(baseline, current, threshold):
+    """Compare two results files; exits non-zero on regressions."""
+    with open(baseline) as f:
+        baseline_report = json.load(f)
+    with open(current) as f:
+        current_report = json.load(f)
+    if compare_results(baseline_report, current_report, threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    cli()
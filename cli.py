@@ -1,5 +1,11 @@
 import click
 from scripts.populate_db import populate_database
+from scripts.rebuild_leaderboard import rebuild_leaderboard as rebuild_leaderboard_job
+from scripts.check_query_plans import check_query_plans as check_query_plans_job
+from scripts.snapshot_ranks import snapshot_ranks as snapshot_ranks_job
+from scripts.update_leagues import update_leagues as update_leagues_job
+from scripts.export_leaderboard import export_leaderboard as export_leaderboard_job
+from scripts.prune_events import prune_change_events as prune_events_job
 import subprocess
 import os
 
@@ -28,6 +34,64 @@ def populate(users, sessions, clear, users_only, sessions_only, leaderboard_only
         leaderboard_only=leaderboard_only
     )
 
+@cli.command()
+@click.option('--chunk-size', default=50000, help='Number of user ids aggregated per chunk')
+@click.option('--workers', default=1, help='Number of worker processes aggregating chunks')
+@click.option('--restart', is_flag=True, help='Discard any saved progress and start over')
+def rebuild_leaderboard(chunk_size, workers, restart):
+    """Rebuild the leaderboard in resumable chunks and swap it in atomically."""
+    ctx = click.Context(rebuild_leaderboard_job)
+    ctx.invoke(
+        rebuild_leaderboard_job,
+        chunk_size=chunk_size,
+        workers=workers,
+        restart=restart
+    )
+
+@cli.command()
+@click.option('--verbose', is_flag=True, help='Print every plan, not just failures')
+def check_query_plans(verbose):
+    """Fail if a hot query no longer uses its intended index."""
+    ctx = click.Context(check_query_plans_job)
+    ctx.invoke(check_query_plans_job, verbose=verbose)
+
+@cli.command()
+@click.option('--every', type=int, default=None, help='Keep running and take a snapshot every N seconds')
+def snapshot_ranks(every):
+    """Append changed players' ranks to the rank history."""
+    ctx = click.Context(snapshot_ranks_job)
+    ctx.invoke(snapshot_ranks_job, every=every)
+
+@cli.command()
+@click.option('--every', type=int, default=None, help='Keep running and update every N seconds')
+def update_leagues(every):
+    """Run league promotion/relegation and re-rank divisions."""
+    ctx = click.Context(update_leagues_job)
+    ctx.invoke(update_leagues_job, every=every)
+
+@cli.command()
+@click.option('--format', 'export_format', type=click.Choice(['csv', 'ndjson']), default='ndjson', help='Output format')
+@click.option('--output', type=click.Path(dir_okay=False, writable=True), default=None, help='File to write (default: stdout)')
+@click.option('--batch-size', default=5000, help='Rows fetched and written per batch')
+def export_leaderboard(export_format, output, batch_size):
+    """Export the whole leaderboard as NDJSON or CSV."""
+    ctx = click.Context(export_leaderboard_job)
+    ctx.invoke(
+        export_leaderboard_job,
+        export_format=export_format,
+        output=output,
+        batch_size=batch_size
+    )
+
+@cli.command()
+@click.option('--keep-days', type=float, default=None, help='Keep events from the last N days (default: CHANGES_RETENTION_DAYS)')
+@click.option('--batch-size', default=10000, help='Events deleted per transaction')
+@click.option('--every', type=int, default=None, help='Keep running and prune every N seconds')
+def prune_events(keep_days, batch_size, every):
+    """Delete change-feed events older than the retention period."""
+    ctx = click.Context(prune_events_job)
+    ctx.invoke(prune_events_job, keep_days=keep_days, batch_size=batch_size, every=every)
+
 @cli.command()
 @click.option('--sql-file', type=click.Path(exists=True), help='SQL file to execute')
 def execute_sql(sql_file):
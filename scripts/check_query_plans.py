@@ -0,0 +1,186 @@
+import json
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import click
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+
+
+@dataclass
+class PlannedQuery:
+    """
+    A hot query and the plan it must keep.
+
+    `index` must appear in the plan. `index_only_on` lists the dialects where
+    that index must answer the query without visiting the table, and
+    `ordered_by_index` forbids an explicit sort step.
+    """
+
+    name: str
+    sql: str
+    params: Dict = field(default_factory=dict)
+    index: str = ""
+    index_only_on: Tuple[str, ...] = ()
+    ordered_by_index: bool = False
+
+
+HOT_QUERIES = [
+    PlannedQuery(
+        name="top_players",
+        sql="""
+            SELECT leaderboard.user_id, users.username, leaderboard.total_score, leaderboard.rank
+            FROM leaderboard JOIN users ON leaderboard.user_id = users.id
+            ORDER BY leaderboard.total_score DESC, leaderboard.tie_break DESC, leaderboard.user_id DESC
+            LIMIT 10
+        """,
+        index="idx_leaderboard_rank_key",
+        index_only_on=("postgresql",),
+        ordered_by_index=True,
+    ),
+    PlannedQuery(
+        name="player_rank",
+        sql="SELECT COUNT(*) + 1 FROM leaderboard WHERE ranked_score > :score",
+        params={"score": 5000.0},
+        index="idx_leaderboard_ranked_key",
+        index_only_on=("sqlite", "postgresql"),
+    ),
+    PlannedQuery(
+        name="rank_shift",
+        sql="""
+            SELECT user_id FROM leaderboard
+            WHERE ranked_score >= :old AND ranked_score < :new AND user_id NOT IN (1, 2)
+        """,
+        params={"old": 5000.0, "new": 5050.0},
+        index="idx_leaderboard_ranked_key",
+    ),
+    PlannedQuery(
+        name="higher_neighbour",
+        sql="""
+            SELECT ranked_score, rank FROM leaderboard
+            WHERE ranked_score > :score
+            ORDER BY ranked_score
+            LIMIT 1
+        """,
+        params={"score": 5000.0},
+        index="idx_leaderboard_ranked_key",
+        ordered_by_index=True,
+    ),
+    PlannedQuery(
+        name="ordinal_neighbour",
+        sql="""
+            SELECT rank FROM leaderboard
+            WHERE (ranked_score, ranked_tie_break, user_id) > (:score, :tie_break, :user_id)
+            ORDER BY ranked_score, ranked_tie_break, user_id
+            LIMIT 1
+        """,
+        params={"score": 5000.0, "tie_break": 0.0, "user_id": 1},
+        index="idx_leaderboard_ranked_key",
+        ordered_by_index=True,
+    ),
+    PlannedQuery(
+        name="user_totals",
+        sql="""
+            SELECT user_id, COUNT(*) AS total_sessions, SUM(score) AS total
+            FROM game_sessions
+            WHERE user_id BETWEEN :low AND :high
+            GROUP BY user_id
+        """,
+        params={"low": 1, "high": 10000},
+        index="idx_user_score",
+        index_only_on=("sqlite", "postgresql"),
+    ),
+    PlannedQuery(
+        name="submission_by_request_id",
+        sql="SELECT id FROM game_sessions WHERE user_id = :user_id AND request_id = :request_id",
+        params={"user_id": 1, "request_id": "retry"},
+        index="uq_game_sessions_user_request",
+    ),
+]
+
+
+def explain(db: Session, query: PlannedQuery) -> List[Tuple[str, str]]:
+    """Return the plan as (step, index name or '') pairs."""
+    if "sqlite" in str(db.bind.url):
+        rows = db.execute(text(f"EXPLAIN QUERY PLAN {query.sql}"), query.params)
+        steps = []
+        for row in rows:
+            detail = row[-1]
+            index = ""
+            for marker in ("USING COVERING INDEX ", "USING INDEX "):
+                if marker in detail:
+                    index = detail.split(marker, 1)[1].split(" ", 1)[0]
+                    detail = "Index Only Scan" if "COVERING" in marker else "Index Scan"
+                    break
+            else:
+                if "TEMP B-TREE" in detail:
+                    detail = "Sort"
+            steps.append((detail, index))
+        return steps
+
+    # Planner statistics on a small or fresh database would favour sequential
+    # scans; what matters here is that the index can serve the query shape.
+    db.execute(text("SET LOCAL enable_seqscan = off"))
+    plan = db.execute(text(f"EXPLAIN (FORMAT JSON) {query.sql}"), query.params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    steps = []
+    nodes = [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        steps.append((node["Node Type"], node.get("Index Name", "")))
+        nodes.extend(node.get("Plans", []))
+    return steps
+
+
+def check_plan(db: Session, query: PlannedQuery) -> List[str]:
+    """Return a list of problems with the query's current plan."""
+    dialect = db.bind.dialect.name
+    steps = explain(db, query)
+    problems = []
+
+    index_steps = [step for step, index in steps if index == query.index]
+    if not index_steps:
+        problems.append(f"does not use {query.index}")
+    elif dialect in query.index_only_on and "Index Only Scan" not in index_steps:
+        problems.append(f"uses {query.index} but not as an index-only scan")
+
+    if query.ordered_by_index and any(step in ("Sort", "Incremental Sort") for step, _ in steps):
+        problems.append("sorts rows instead of reading them in index order")
+
+    return problems
+
+
+@click.command()
+@click.option('--verbose', is_flag=True, help='Print every plan, not just failures')
+def check_query_plans(verbose):
+    """Verify that the hot leaderboard queries are still served by their indexes."""
+    db = SessionLocal()
+    failures = 0
+
+    try:
+        for query in HOT_QUERIES:
+            problems = check_plan(db, query)
+            db.rollback()
+            if problems:
+                failures += 1
+                click.echo(f"❌ {query.name}: {'; '.join(problems)}")
+            else:
+                click.echo(f"✅ {query.name}")
+            if verbose or problems:
+                for step, index in explain(db, query):
+                    click.echo(f"    {step} {index}".rstrip())
+                db.rollback()
+    finally:
+        db.close()
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    check_query_plans()
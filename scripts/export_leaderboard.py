@@ -0,0 +1,28 @@
+import sys
+import time
+
+import click
+
+from app.services.export import EXPORT_BATCH_SIZE, MEDIA_TYPES, export_chunks
+
+
+@click.command()
+@click.option('--format', 'export_format', type=click.Choice(sorted(MEDIA_TYPES)), default='ndjson', help='Output format')
+@click.option('--output', type=click.Path(dir_okay=False, writable=True), default=None, help='File to write (default: stdout)')
+@click.option('--batch-size', default=EXPORT_BATCH_SIZE, help='Rows fetched and written per batch')
+def export_leaderboard(export_format, output, batch_size):
+    """Write the whole leaderboard in rank order, streaming it batch by batch."""
+    start_time = time.time()
+    out = open(output, 'w', newline='') if output else sys.stdout
+    try:
+        for chunk in export_chunks(export_format, batch_size):
+            out.write(chunk)
+    finally:
+        if output:
+            out.close()
+    if output:
+        click.echo(f"✅ Exported leaderboard to {output} in {time.time() - start_time:.2f} seconds")
+
+
+if __name__ == "__main__":
+    export_leaderboard()
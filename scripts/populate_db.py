@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text, func
 from app.core.database import engine, SessionLocal
 from app.models import User, GameSession, Leaderboard
+from scripts.rebuild_leaderboard import run_rebuild
 import click
 import time
 
@@ -91,36 +92,9 @@ def populate_game_sessions(db: Session, count: int = 5000000):
     click.echo(f"✅ Successfully populated {count} game sessions")
 
 def populate_leaderboard(db: Session):
-    """Populate leaderboard by aggregating scores."""
+    """Populate leaderboard by aggregating scores with the active scoring rule."""
     click.echo("Populating leaderboard...")
-    
-    # Clear existing leaderboard
-    db.execute(text("DELETE FROM leaderboard"))
-    
-    # SQLite compatible query for leaderboard aggregation
-    if 'sqlite' in str(engine.url):
-        db.execute(text("""
-            INSERT INTO leaderboard (user_id, total_score, rank)
-            SELECT 
-                user_id, 
-                AVG(score) as total_score,
-                RANK() OVER (ORDER BY SUM(score) DESC) as rank
-            FROM game_sessions 
-            GROUP BY user_id
-        """))
-    else:
-        # PostgreSQL version
-        db.execute(text("""
-            INSERT INTO leaderboard (user_id, total_score, rank)
-            SELECT 
-                user_id, 
-                AVG(score) as total_score,
-                RANK() OVER (ORDER BY SUM(score) DESC) as rank
-            FROM game_sessions 
-            GROUP BY user_id
-        """))
-    
-    db.commit()
+    run_rebuild(db, restart=True)
     click.echo("✅ Successfully populated leaderboard")
 
 def clear_all_data(db: Session):
@@ -0,0 +1,37 @@
+import time
+from datetime import datetime, timedelta
+
+import click
+
+from app.core.database import SessionLocal
+from app.services.outbox import CHANGES_RETENTION, PRUNE_BATCH_SIZE, prune_events
+
+
+@click.command()
+@click.option('--keep-days', type=float, default=None, help='Keep events from the last N days (default: CHANGES_RETENTION_DAYS)')
+@click.option('--batch-size', default=PRUNE_BATCH_SIZE, help='Events deleted per transaction')
+@click.option('--every', type=int, default=None, help='Keep running and prune every N seconds')
+def prune_change_events(keep_days, batch_size, every):
+    """Delete change-feed events older than the retention period."""
+    retention = CHANGES_RETENTION if keep_days is None else timedelta(days=keep_days)
+    while True:
+        db = SessionLocal()
+        start_time = time.time()
+        try:
+            deleted = prune_events(db, datetime.utcnow() - retention, batch_size)
+            click.echo(
+                f"✅ Pruned {deleted} events in {time.time() - start_time:.2f} seconds"
+            )
+        except Exception as e:
+            click.echo(f"❌ Error: {str(e)}")
+            db.rollback()
+        finally:
+            db.close()
+
+        if every is None:
+            break
+        time.sleep(max(every - (time.time() - start_time), 0))
+
+
+if __name__ == "__main__":
+    prune_change_events()
@@ -0,0 +1,222 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import List, Tuple
+
+import click
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal, engine
+from app.models import RebuildCheckpoint
+from app.services.meta import set_meta
+from app.services.outbox import lock_outbox, log_reset
+from app.services.ranking import default_tie_break_sql, mark_ranks_current, recompute_ranks
+from app.services.scoring import META_KEY, active_rule, aggregate_users
+
+JOB_NAME = "leaderboard"
+
+
+def plan_chunks(start_user_id: int, max_user_id: int, chunk_size: int) -> List[Tuple[int, int]]:
+    """Split [start_user_id, max_user_id] into inclusive user-id ranges."""
+    return [
+        (low, min(low + chunk_size - 1, max_user_id))
+        for low in range(start_user_id, max_user_id + 1, chunk_size)
+    ]
+
+
+def _stage_users(db: Session, low: int, high: int):
+    rows = [
+        {
+            "user_id": user_id,
+            "total_sessions": total_sessions,
+            "total_score": total_score,
+            "rule_state": rule_state,
+            "scoring_rule": active_rule.name,
+        }
+        for user_id, total_sessions, total_score, rule_state
+        in aggregate_users(db, active_rule, low, high)
+    ]
+    db.execute(
+        text("DELETE FROM leaderboard_staging WHERE user_id BETWEEN :low AND :high"),
+        {"low": low, "high": high},
+    )
+    if rows:
+        db.execute(
+            text("""
+                INSERT INTO leaderboard_staging
+                    (user_id, total_score, total_sessions, rule_state, scoring_rule)
+                VALUES
+                    (:user_id, :total_score, :total_sessions, :rule_state, :scoring_rule)
+            """),
+            rows,
+        )
+
+
+def aggregate_chunk(db: Session, bounds: Tuple[int, int]):
+    """
+    Aggregate one user-id range of game_sessions into the staging table
+    using the active scoring rule. Safe to re-run: the range is replaced.
+    """
+    _stage_users(db, *bounds)
+    db.commit()
+
+
+def swap_in_staging(db: Session, session_watermark: int):
+    """Rank the staging table and replace the leaderboard with it in one transaction."""
+    # One whole-board writer at a time, then keep submits off the table until
+    # the swap commits: a submit committed before this point is caught up
+    # below, a later one applies its session on top of the swapped-in row
+    lock_outbox(db)
+    if "sqlite" not in str(db.bind.url):
+        db.execute(text("LOCK TABLE leaderboard IN EXCLUSIVE MODE"))
+    # Players who submitted while the chunks were being aggregated may be
+    # missing those sessions in staging; re-aggregate just them
+    recent_users = db.execute(
+        text("SELECT DISTINCT user_id FROM game_sessions WHERE id > :watermark"),
+        {"watermark": session_watermark},
+    ).scalars().all()
+    for user_id in recent_users:
+        _stage_users(db, user_id, user_id)
+
+    # Players whose score did not change keep their place among ties
+    db.execute(text(f"UPDATE leaderboard_staging SET tie_break = {default_tie_break_sql()}"))
+    db.execute(text("""
+        UPDATE leaderboard_staging
+        SET tie_break = l.tie_break
+        FROM leaderboard AS l
+        WHERE l.user_id = leaderboard_staging.user_id
+          AND l.total_score = leaderboard_staging.total_score
+    """))
+    recompute_ranks(db, table="leaderboard_staging")
+    # Keep league placements; the promotion job decides who moves
+    db.execute(text("""
+        UPDATE leaderboard_staging
+        SET tier = l.tier, division = l.division, division_rank = l.division_rank
+        FROM leaderboard AS l
+        WHERE l.user_id = leaderboard_staging.user_id AND l.division IS NOT NULL
+    """))
+    db.execute(text("DELETE FROM leaderboard"))
+    db.execute(
+        text("""
+            INSERT INTO leaderboard
+                (user_id, total_score, rank, total_sessions, rule_state, scoring_rule,
+                 tie_break, tier, division, division_rank, changed_at,
+                 ranked_score, ranked_tie_break)
+            SELECT user_id, total_score, rank, total_sessions, rule_state, scoring_rule,
+                   tie_break, tier, division, division_rank, :changed_at,
+                   total_score, tie_break
+            FROM leaderboard_staging
+        """),
+        {"changed_at": datetime.utcnow()},
+    )
+    db.execute(text("DELETE FROM leaderboard_staging"))
+    mark_ranks_current(db)
+    log_reset(db)
+    db.execute(
+        text("DELETE FROM rebuild_checkpoints WHERE job = :job"), {"job": JOB_NAME}
+    )
+    set_meta(db, META_KEY, active_rule.name)
+    db.commit()
+
+
+def _start_or_resume(db: Session, restart: bool) -> RebuildCheckpoint:
+    checkpoint = db.get(RebuildCheckpoint, JOB_NAME)
+    if checkpoint is not None and not restart:
+        click.echo(f"Resuming rebuild after user {checkpoint.last_user_id}...")
+        return checkpoint
+
+    db.execute(text("DELETE FROM leaderboard_staging"))
+    if checkpoint is None:
+        checkpoint = RebuildCheckpoint(job=JOB_NAME)
+        db.add(checkpoint)
+    checkpoint.last_user_id = 0
+    checkpoint.session_watermark = (
+        db.execute(text("SELECT MAX(id) FROM game_sessions")).scalar() or 0
+    )
+    checkpoint.started_at = checkpoint.updated_at = datetime.utcnow()
+    db.commit()
+    return checkpoint
+
+
+def _advance(db: Session, checkpoint: RebuildCheckpoint, last_user_id: int):
+    checkpoint.last_user_id = last_user_id
+    checkpoint.updated_at = datetime.utcnow()
+    db.commit()
+
+
+def _init_worker():
+    # Connections inherited from the parent process must not be reused
+    engine.dispose(close=False)
+
+
+def _aggregate_chunk_in_worker(bounds: Tuple[int, int]) -> Tuple[int, int]:
+    db = SessionLocal()
+    try:
+        aggregate_chunk(db, bounds)
+    finally:
+        db.close()
+    return bounds
+
+
+def run_rebuild(db: Session, chunk_size: int = 50000, workers: int = 1, restart: bool = False):
+    """
+    Rebuild the leaderboard from game_sessions without emptying it meanwhile.
+
+    Chunks of user ids are aggregated into leaderboard_staging and progress is
+    checkpointed, so an interrupted run picks up where it stopped. The live
+    leaderboard keeps serving the previous data until the final swap.
+    """
+    checkpoint = _start_or_resume(db, restart)
+    max_user_id = db.execute(text("SELECT MAX(user_id) FROM game_sessions")).scalar() or 0
+    chunks = plan_chunks(checkpoint.last_user_id + 1, max_user_id, chunk_size)
+    click.echo(
+        f"Aggregating {len(chunks)} chunks of up to {chunk_size} users "
+        f"with the {active_rule.name} scoring rule..."
+    )
+
+    if workers > 1 and 'sqlite' in str(engine.url):
+        click.echo("SQLite allows a single writer; aggregating with one worker.")
+        workers = 1
+
+    if workers > 1:
+        # map() yields in chunk order, so the checkpoint only ever covers
+        # a contiguous prefix even though chunks finish out of order
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            for bounds in pool.map(_aggregate_chunk_in_worker, chunks):
+                _advance(db, checkpoint, bounds[1])
+                click.echo(f"Aggregated users {bounds[0]}-{bounds[1]}")
+    else:
+        for bounds in chunks:
+            aggregate_chunk(db, bounds)
+            _advance(db, checkpoint, bounds[1])
+            click.echo(f"Aggregated users {bounds[0]}-{bounds[1]}")
+
+    click.echo("Ranking and swapping in the rebuilt leaderboard...")
+    swap_in_staging(db, checkpoint.session_watermark or 0)
+
+
+@click.command()
+@click.option('--chunk-size', default=50000, help='Number of user ids aggregated per chunk')
+@click.option('--workers', default=1, help='Number of worker processes aggregating chunks')
+@click.option('--restart', is_flag=True, help='Discard any saved progress and start over')
+def rebuild_leaderboard(chunk_size, workers, restart):
+    """Rebuild the leaderboard in resumable chunks and swap it in atomically."""
+    db = SessionLocal()
+    start_time = time.time()
+
+    try:
+        run_rebuild(db, chunk_size, workers, restart)
+
+        end_time = time.time()
+        click.echo(f"✅ Leaderboard rebuilt in {end_time - start_time:.2f} seconds")
+
+    except Exception as e:
+        click.echo(f"❌ Error: {str(e)}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    rebuild_leaderboard()
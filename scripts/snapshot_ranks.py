@@ -0,0 +1,33 @@
+import time
+
+import click
+
+from app.core.database import SessionLocal
+from app.services.rank_history import take_snapshot
+
+
+@click.command()
+@click.option('--every', type=int, default=None, help='Keep running and take a snapshot every N seconds')
+def snapshot_ranks(every):
+    """Record the rank and score of every player that changed since the last snapshot."""
+    while True:
+        db = SessionLocal()
+        start_time = time.time()
+        try:
+            sampled = take_snapshot(db)
+            click.echo(
+                f"✅ Snapshot recorded {sampled} players in {time.time() - start_time:.2f} seconds"
+            )
+        except Exception as e:
+            click.echo(f"❌ Error: {str(e)}")
+            db.rollback()
+        finally:
+            db.close()
+
+        if every is None:
+            break
+        time.sleep(max(every - (time.time() - start_time), 0))
+
+
+if __name__ == "__main__":
+    snapshot_ranks()
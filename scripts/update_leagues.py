@@ -0,0 +1,33 @@
+import time
+
+import click
+
+from app.core.database import SessionLocal
+from app.services.leagues import run_promotions
+
+
+@click.command()
+@click.option('--every', type=int, default=None, help='Keep running and update every N seconds')
+def update_leagues(every):
+    """Promote and relegate players between league tiers and re-rank every division."""
+    while True:
+        db = SessionLocal()
+        start_time = time.time()
+        try:
+            placed = run_promotions(db)
+            click.echo(
+                f"✅ Leagues updated, {placed} players placed in {time.time() - start_time:.2f} seconds"
+            )
+        except Exception as e:
+            click.echo(f"❌ Error: {str(e)}")
+            db.rollback()
+        finally:
+            db.close()
+
+        if every is None:
+            break
+        time.sleep(max(every - (time.time() - start_time), 0))
+
+
+if __name__ == "__main__":
+    update_leagues()
@@ -0,0 +1,4 @@
+import os
+
+# app.core.database refuses to import without a database URL
+os.environ.setdefault("DATABASE_URL", "sqlite://")
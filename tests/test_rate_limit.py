@@ -0,0 +1,76 @@
+import fakeredis
+import pytest
+from starlette.requests import Request
+
+from app.services.rate_limit import RedisTokenBucketLimiter, TokenBucketLimiter, client_identity
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def limiter(server):
+    return RedisTokenBucketLimiter(fakeredis.FakeRedis(server=server))
+
+
+def test_redis_bucket_allows_burst_then_waits(limiter):
+    assert [limiter.take("client:a", rate=1, burst=3) for _ in range(3)] == [0, 0, 0]
+    wait = limiter.take("client:a", rate=1, burst=3)
+    assert 0 < wait <= 1
+
+
+def test_redis_buckets_are_per_key(limiter):
+    limiter.take("user:1", rate=1, burst=1)
+    assert limiter.take("user:1", rate=1, burst=1) > 0
+    assert limiter.take("user:2", rate=1, burst=1) == 0
+
+
+def test_redis_buckets_are_shared_between_limiters(server, limiter):
+    other_worker = RedisTokenBucketLimiter(fakeredis.FakeRedis(server=server))
+    limiter.take("client:a", rate=1, burst=1)
+    assert other_worker.take("client:a", rate=1, burst=1) > 0
+
+
+def test_redis_bucket_expires(server, limiter):
+    limiter.take("client:a", rate=10, burst=5)
+    ttl = fakeredis.FakeRedis(server=server).ttl("rate-limit:client:a")
+    assert 0 < ttl <= 2
+
+
+def test_falls_back_to_local_buckets_on_redis_error(server, limiter):
+    server.connected = False
+    assert [limiter.take("client:a", rate=1, burst=2) for _ in range(2)] == [0, 0]
+    assert limiter.take("client:a", rate=1, burst=2) > 0
+
+
+def test_local_bucket_evicts_least_recently_used():
+    buckets = TokenBucketLimiter(max_buckets=2)
+    buckets.take("a", rate=1, burst=1)
+    buckets.take("b", rate=1, burst=1)
+    buckets.take("c", rate=1, burst=1)
+    # "a" was evicted, so it starts over with a full bucket
+    assert buckets.take("a", rate=1, burst=1) == 0
+    assert buckets.take("c", rate=1, burst=1) > 0
+
+
+def _request(headers=(), client=("10.0.0.1", 1234)):
+    return Request(
+        {
+            "type": "http",
+            "headers": [(name.lower().encode(), value.encode()) for name, value in headers],
+            "client": client,
+        }
+    )
+
+
+def test_client_identity_uses_header_when_configured():
+    request = _request([("X-Client-Id", "game-server-7")])
+    assert client_identity(request, header="X-Client-Id") == "game-server-7"
+    assert client_identity(request, header=None) == "10.0.0.1"
+
+
+def test_client_identity_falls_back_to_address():
+    assert client_identity(_request(), header="X-Client-Id") == "10.0.0.1"
+    assert client_identity(_request(client=None), header=None) == ""
@@ -0,0 +1,57 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import app.services.rate_limit as rate_limit
+from app.main import app
+from app.routers import leaderboard
+from app.schemas import ScoreResponse
+from app.services.idempotency import submission_cache
+from app.services.rate_limit import AdmissionGate, SubmitLimiter, TokenBucketLimiter
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(rate_limit, "USER_RATE", 0.1)
+    monkeypatch.setattr(rate_limit, "USER_BURST", 1)
+    monkeypatch.setattr(leaderboard, "submit_limiter", SubmitLimiter(TokenBucketLimiter()))
+    monkeypatch.setattr(leaderboard, "submit_gate", AdmissionGate(limit=1))
+    # No players: every submission that gets through is a 404
+    monkeypatch.setattr(leaderboard, "_user_exists", lambda db, user_id: False)
+    return TestClient(app)
+
+
+def test_rate_limited_submission_gets_429_with_retry_after(client):
+    assert client.post("/api/leaderboard/submit", json={"user_id": 1, "score": 10}).status_code == 404
+    response = client.post("/api/leaderboard/submit", json={"user_id": 1, "score": 10})
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["Retry-After"]) <= 10
+
+
+def test_submission_over_the_gate_gets_503_with_retry_after(client):
+    leaderboard.submit_gate.active = leaderboard.submit_gate.limit
+    response = client.post("/api/leaderboard/submit", json={"user_id": 1, "score": 10})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_gate_is_released_when_the_handler_raises(client, monkeypatch):
+    def fail(db, user_id):
+        raise RuntimeError("database is gone")
+
+    monkeypatch.setattr(leaderboard, "_user_exists", fail)
+    response = client.post("/api/leaderboard/submit", json={"user_id": 1, "score": 10})
+    assert response.status_code == 500
+    assert leaderboard.submit_gate.active == 0
+
+
+def test_cached_retries_are_not_rate_limited(client, monkeypatch):
+    cached = ScoreResponse(message="Score submitted successfully", user_id=2, score=10, total_sessions=1)
+    monkeypatch.setitem(submission_cache._entries, (2, "retry-me"), cached)
+    for _ in range(3):
+        response = client.post(
+            "/api/leaderboard/submit", json={"user_id": 2, "score": 10, "request_id": "retry-me"}
+        )
+        assert response.status_code == 200
+        assert response.json()["total_sessions"] == 1
+    # The retries left the player's bucket full
+    assert client.post("/api/leaderboard/submit", json={"user_id": 2, "score": 10}).status_code == 404